@@ -2,7 +2,8 @@ from tkinter import Tk
 import chess.pgn
 import pygame
 import sys
-import os
+import Source.display as display
+import Source.assets as assets
 from Source.gamePlay import Themes, main as gameMain
 from Source.chessLogic import fenParse
 from tkinter.filedialog import askopenfilename
@@ -25,6 +26,16 @@ class AnalysisBoard:
 
 class AnalysisMain:
     def __init__(self):
+        self.loadGame()
+        #theme of the board
+        self.boardTheme = Themes()
+
+        #defining the screen, which is shared with the menu, and the background
+        self.screen = display.getScreen((1000, 800), "Analysis")
+        self.background = assets.getImage("PBackground.png")
+        self.controls = assets.getImage("AControls.png")
+
+    def loadGame(self):
         #I would like to not have any GUI output from TKInter, so I am withdrawing Tk
         Tk().withdraw()
 
@@ -52,28 +63,13 @@ class AnalysisMain:
         fenList = []
         #iterates for each move in the games moves
         for move in game.mainline_moves():
-            #gets the boards FEN
-            boardFEN = board.fen()
-            #splits the FEN, and separates into two variables 'boardPosition' and 'boardInfo
-            splitFEN = boardFEN.split(' ', 2)
-            boardPosition = splitFEN[0]
-            #appends to the fen list
-            fenList.append(boardPosition)
+            #appends the boards full FEN to the fen list, so the side to move, castling rights
+            #and en passant square go with the position when a game is started from it
+            fenList.append(board.fen(en_passant='fen'))
             #makes the move
             board.push(move)
 
         self.analysisBoard = AnalysisBoard(fenList)
-        #theme of the board
-        self.boardTheme = Themes()
-
-        #pygame initialisation
-        pygame.init()
-        #defining the screen and the background
-        self.screen = pygame.display.set_mode((1000, 800))
-        self.background = pygame.image.load(os.path.join("Assets/PBackground.png"))
-        self.controls = pygame.image.load(os.path.join("Assets/AControls.png"))
-
-        pygame.display.set_caption("Analysis")
 
     def mainLoop(self):
         #main loop for pygame
@@ -94,17 +90,16 @@ class AnalysisMain:
                                 return 0 
                             #'A' to play against the AI
                             case pygame.K_a:
-                                colourToPlay = 'W' if self.analysisBoard.positionIndex % 2 == 0 else 'b'
-                                gameMain('AI', self.analysisBoard.positions[self.analysisBoard.positionIndex%len(self.analysisBoard.positions)], colourToPlay)
+                                #the side to move is read from the FEN
+                                gameMain('AI', self.analysisBoard.positions[self.analysisBoard.positionIndex%len(self.analysisBoard.positions)])
                                 return 0
                             #'S' to play against self
                             case pygame.K_s:
-                                colourToPlay = 'W' if self.analysisBoard.positionIndex % 2 == 0 else 'b'
-                                gameMain('', self.analysisBoard.positions[self.analysisBoard.positionIndex%len(self.analysisBoard.positions)], colourToPlay)
+                                gameMain('', self.analysisBoard.positions[self.analysisBoard.positionIndex%len(self.analysisBoard.positions)])
                                 return 0
                             #lets the user pick another PGN when 'R' pressed
                             case pygame.K_r:
-                                self.__init__()
+                                self.loadGame()
                     case pygame.MOUSEWHEEL:
                         #event.y is the direction of scroll
                         match event.y:
@@ -161,24 +156,13 @@ class AnalysisMain:
         squareSize = 90
         centreValue = (squareSize-80)//2
 
-        def getFileName(pieceName):
-            ##if pieceName.isupper(), then the piece is white
-            if pieceName.isupper():
-                return 'w' + pieceName.lower()
-            ##else the piece is black and the file name is kept the same
-            else:
-                return pieceName
-
         ##iterate through all squares on the board.
         for r in range(8):
             for c in range(8):
                 ##gets the piece's name, by indexing the currentPos attribute
                 if self.analysisBoard.viewedPosition[r][c] != '':
-                    pieceName = getFileName(self.analysisBoard.viewedPosition[r][c])
-                    ##turns this into a file name using an f-string
-                    pieceFileName = f'{pieceName}.png'
-                    ##load the image from file and then draw it onto the square
-                    piece = pygame.image.load(os.path.join(f'Assets/{pieceFileName}'))
+                    ##the piece images are loaded once and shared, so nothing is read from file here
+                    piece = assets.getPieceImage(self.analysisBoard.viewedPosition[r][c])
                     self.screen.blit(piece, (topLeft[0]+(squareSize*c)+centreValue,topLeft[1]+(squareSize*r)+centreValue))                            
 
 def main():
@@ -0,0 +1,59 @@
+#ASSETS
+#every image is loaded from disk once and kept, and all the screens share them, so drawing a frame
+#never reads or decodes a file. images are converted to the display's pixel format when they are
+#loaded, so blitting them does not have to convert them again on every frame.
+import os
+import pygame
+
+ASSETPATH = "Assets"
+#whether the pieces are packed into one sprite sheet, each piece being a subsurface of it
+USESPRITESHEET = True
+#the order the pieces are packed into the sprite sheet
+SHEETPIECES = 'PNBRQKpnbrqk'
+
+#loaded images by file name, and piece images by piece letter
+images = {}
+pieceImages = {}
+
+def convertImage(image):
+    #converting needs a display, so an image loaded before the window exists is kept as it is.
+    #images with transparency keep their alpha channel, opaque images are converted without one
+    if pygame.display.get_surface() is None:
+        return image
+    if image.get_flags() & pygame.SRCALPHA:
+        return image.convert_alpha()
+    return image.convert()
+
+def getImage(fileName):
+    #returns the image in the assets folder, loading it the first time it is asked for
+    if fileName not in images:
+        images[fileName] = convertImage(pygame.image.load(os.path.join(ASSETPATH, fileName)))
+    return images[fileName]
+
+def getPieceFileName(piece):
+    #white pieces are saved as 'w' and the letter, black pieces as just the letter
+    if piece.isupper():
+        return f'w{piece.lower()}.png'
+    return f'{piece}.png'
+
+def loadSpriteSheet():
+    #draws every piece side by side on one surface, and makes each piece a subsurface of it,
+    #so all twelve pieces are kept in one block of memory
+    pieces = [pygame.image.load(os.path.join(ASSETPATH, getPieceFileName(piece))) for piece in SHEETPIECES]
+    width = max(piece.get_width() for piece in pieces)
+    height = max(piece.get_height() for piece in pieces)
+    sheet = pygame.Surface((width * len(pieces), height), pygame.SRCALPHA)
+    for index, piece in enumerate(pieces):
+        sheet.blit(piece, (index * width, 0))
+    sheet = convertImage(sheet)
+    for index, piece in enumerate(SHEETPIECES):
+        pieceImages[piece] = sheet.subsurface(pygame.Rect(index * width, 0, pieces[index].get_width(), pieces[index].get_height()))
+
+def getPieceImage(piece):
+    #returns the image for a piece letter, such as 'K' or 'p'
+    if piece not in pieceImages:
+        if USESPRITESHEET:
+            loadSpriteSheet()
+        else:
+            pieceImages[piece] = getImage(getPieceFileName(piece))
+    return pieceImages[piece]
@@ -0,0 +1,50 @@
+#BATCH EVALUATION
+#evaluates many positions in one call with numpy, for offline work such as scoring every position
+#of a game or a set of self play games. the scores are the same as ChessAI.evaluationFunction gives.
+#a batch of N positions is encoded as an (N, 64) int8 array, holding a piece index for each square.
+import numpy as np
+import Source.const as const
+import Source.chessLogic as chessLogic
+
+#the index each piece letter is encoded as. 0 is an empty square
+PIECEINDEX = {piece: index+1 for index, piece in enumerate('PNBRQKpnbrqk')}
+
+#the piece index for every character code, so a whole batch of squares is encoded with one lookup.
+#empty squares are written as '.', which maps to 0 like every other character that is not a piece
+CHARACTERINDEX = np.zeros(256, dtype=np.int8)
+for piece, index in PIECEINDEX.items():
+    CHARACTERINDEX[ord(piece)] = index
+
+#SCORETABLE[piece index][square] is the piece's value plus its position bonus, from const.pieceSquareScores
+SCORETABLE = np.zeros((len(PIECEINDEX)+1, 64), dtype=np.int32)
+for piece, index in PIECEINDEX.items():
+    SCORETABLE[index] = const.pieceSquareScores[piece]
+
+#used to expand the placement field of a FEN into 64 characters
+FENEXPANSION = {ord(str(count)): '.' * count for count in range(1, 9)}
+FENEXPANSION[ord('/')] = None
+
+def squareString(position):
+    #the 64 squares of a position as a string, with '.' for empty squares.
+    #position can be a Board, a FEN or a currentPos style list of rows
+    if isinstance(position, chessLogic.Board):
+        position = position.currentPos
+    if isinstance(position, str):
+        return position.split()[0].translate(FENEXPANSION)
+    return ''.join(square or '.' for row in position for square in row)
+
+def encodePositions(positions):
+    #returns an (N, 64) int8 array of piece indexes, one row for each position
+    squares = ''.join(squareString(position) for position in positions)
+    characters = np.frombuffer(squares.encode('ascii'), dtype=np.uint8)
+    return CHARACTERINDEX[characters].reshape(-1, 64)
+
+def evaluateEncoded(encoded):
+    #returns the evaluation of each encoded position, in pawns with white positive
+    #each square's score is looked up by its piece index, then the squares are added up for each position
+    scores = SCORETABLE[encoded, np.arange(64)].sum(axis=1, dtype=np.int64)
+    return 0.01 * scores
+
+def evaluatePositions(positions):
+    #encodes and evaluates a list of Boards, FENs or positions
+    return evaluateEncoded(encodePositions(positions))
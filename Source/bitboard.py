@@ -0,0 +1,205 @@
+#BITBOARD HELPERS AND PRECOMPUTED ATTACK TABLES
+#a bitboard is a 64 bit int, with one bit for each square of the board.
+#squares are numbered the same way as Board.currentPos is indexed, so square = row*8 + col,
+#where row 0 is the top of the board (black's back rank) and col 0 is the a-file.
+
+FULL = 0xFFFFFFFFFFFFFFFF
+
+#masks for the a and h files, used to stop pawn captures wrapping around the board
+FILE_A = sum(1 << (row*8) for row in range(8))
+FILE_H = sum(1 << (row*8 + 7) for row in range(8))
+
+#masks for each row of the board
+ROWS = [0xFF << (row*8) for row in range(8)]
+
+#the offsets each piece moves in, as (row, col) increments
+KNIGHTOFFSETS = [
+    ( 2, 1), ( 2, -1),
+    (-2, 1), (-2, -1),
+    ( 1, 2), ( 1, -2),
+    (-1, 2), (-1, -2)
+]
+KINGOFFSETS = [
+    ( 1, 1),  ( 1, 0),
+    (-1, 1),  (-1, 0),
+    ( 1,-1),  ( 0, 1),
+    (-1,-1),  ( 0,-1)
+]
+ROOKDIRECTIONS = [(1,0),(0,1),(-1,0),(0,-1)]
+BISHOPDIRECTIONS = [(1,1),(-1,1),(1,-1),(-1,-1)]
+
+
+#(row, col) for every square, so move generation does not need to call divmod
+COORDS = [divmod(square, 8) for square in range(64)]
+
+def squareOf(row, col):
+    return row*8 + col
+
+def coordsOf(square):
+    #returns (row, col) for a square index
+    return divmod(square, 8)
+
+def lowestSquare(bb):
+    #index of the least significant set bit
+    return (bb & -bb).bit_length() - 1
+
+def squares(bb):
+    #yields the index of every set bit, lowest first
+    while bb:
+        lsb = bb & -bb
+        yield lsb.bit_length() - 1
+        bb ^= lsb
+
+
+def buildLeaperTable(offsets):
+    #for every square, a bitboard of all squares reachable with one of the offsets
+    table = []
+    for square in range(64):
+        row, col = coordsOf(square)
+        attacks = 0
+        for offset in offsets:
+            targetRow = row + offset[0]
+            targetCol = col + offset[1]
+            if targetRow in range(0,8) and targetCol in range(0,8):
+                attacks |= 1 << squareOf(targetRow, targetCol)
+        table.append(attacks)
+    return table
+
+def buildRayTable(direction):
+    #for every square, a bitboard of the squares a slider would reach on an empty board
+    table = []
+    for square in range(64):
+        row, col = coordsOf(square)
+        ray = 0
+        row += direction[0]
+        col += direction[1]
+        while row in range(0,8) and col in range(0,8):
+            ray |= 1 << squareOf(row, col)
+            row += direction[0]
+            col += direction[1]
+        table.append(ray)
+    return table
+
+
+KNIGHTATTACKS = buildLeaperTable(KNIGHTOFFSETS)
+KINGATTACKS = buildLeaperTable(KINGOFFSETS)
+
+#the squares a pawn of the given colour attacks from each square
+#white pawns move up the board (towards row 0), black pawns move down
+PAWNATTACKS = {
+    'W': buildLeaperTable([(-1, 1), (-1, -1)]),
+    'b': buildLeaperTable([(1, 1), (1, -1)])
+}
+
+#rays in each direction. directions that increase the square index have their first blocker
+#at the lowest set bit, the others at the highest set bit.
+RAYS = {direction: buildRayTable(direction) for direction in ROOKDIRECTIONS + BISHOPDIRECTIONS}
+
+def buildBetweenTable():
+    #BETWEEN[a][b] is a bitboard of the squares strictly between a and b, if they share a line
+    #squares that are not on a common rank, file or diagonal have nothing between them
+    table = [[0] * 64 for square in range(64)]
+    for square in range(64):
+        for direction in ROOKDIRECTIONS + BISHOPDIRECTIONS:
+            row, col = coordsOf(square)
+            between = 0
+            row += direction[0]
+            col += direction[1]
+            while row in range(0,8) and col in range(0,8):
+                table[square][squareOf(row, col)] = between
+                between |= 1 << squareOf(row, col)
+                row += direction[0]
+                col += direction[1]
+    return table
+
+BETWEEN = buildBetweenTable()
+
+def isIncreasing(direction):
+    return direction[0] > 0 or (direction[0] == 0 and direction[1] > 0)
+
+#(ray table, increasing) pairs, so the attack functions do not need to look anything up
+ROOKRAYS = [(RAYS[direction], isIncreasing(direction)) for direction in ROOKDIRECTIONS]
+BISHOPRAYS = [(RAYS[direction], isIncreasing(direction)) for direction in BISHOPDIRECTIONS]
+
+
+def slidingAttacks(square, occupancy, rays):
+    attacks = 0
+    for table, increasing in rays:
+        ray = table[square]
+        blockers = ray & occupancy
+        if blockers:
+            #the first blocker is included, everything behind it is removed
+            blocker = (blockers & -blockers).bit_length() - 1 if increasing else blockers.bit_length() - 1
+            ray ^= table[blocker]
+        attacks |= ray
+    return attacks
+
+def rookAttacks(square, occupancy):
+    return slidingAttacks(square, occupancy, ROOKRAYS)
+
+def bishopAttacks(square, occupancy):
+    return slidingAttacks(square, occupancy, BISHOPRAYS)
+
+def queenAttacks(square, occupancy):
+    return slidingAttacks(square, occupancy, ROOKRAYS) | slidingAttacks(square, occupancy, BISHOPRAYS)
+
+
+def pieceLetters(colour):
+    #the pawn, knight, bishop, rook, queen and king letters for a colour
+    return ('P', 'N', 'B', 'R', 'Q', 'K') if colour == 'W' else ('p', 'n', 'b', 'r', 'q', 'k')
+
+def isSquareAttacked(bitboards, occupancy, square, attackerColour, allPieces=None):
+    #returns True if any piece of attackerColour attacks the square
+    #allPieces can be given to use a different occupancy for sliding pieces, e.g. with the king removed
+    pawn, knight, bishop, rook, queen, king = pieceLetters(attackerColour)
+    defenderColour = 'b' if attackerColour == 'W' else 'W'
+
+    #a pawn attacks this square if a defending pawn here would attack the pawn
+    if PAWNATTACKS[defenderColour][square] & bitboards[pawn]:
+        return True
+    if KNIGHTATTACKS[square] & bitboards[knight]:
+        return True
+    if KINGATTACKS[square] & bitboards[king]:
+        return True
+
+    if allPieces is None:
+        allPieces = occupancy['W'] | occupancy['b']
+    diagonalPieces = bitboards[bishop] | bitboards[queen]
+    if diagonalPieces and bishopAttacks(square, allPieces) & diagonalPieces:
+        return True
+    straightPieces = bitboards[rook] | bitboards[queen]
+    if straightPieces and rookAttacks(square, allPieces) & straightPieces:
+        return True
+    return False
+
+def attackersOf(bitboards, occupancy, square, attackerColour):
+    #returns a bitboard of every piece of attackerColour that attacks the square
+    pawn, knight, bishop, rook, queen, king = pieceLetters(attackerColour)
+    defenderColour = 'b' if attackerColour == 'W' else 'W'
+    allPieces = occupancy['W'] | occupancy['b']
+
+    attackers = PAWNATTACKS[defenderColour][square] & bitboards[pawn]
+    attackers |= KNIGHTATTACKS[square] & bitboards[knight]
+    attackers |= KINGATTACKS[square] & bitboards[king]
+    attackers |= bishopAttacks(square, allPieces) & (bitboards[bishop] | bitboards[queen])
+    attackers |= rookAttacks(square, allPieces) & (bitboards[rook] | bitboards[queen])
+    return attackers
+
+def pinnedPieces(bitboards, occupancy, kingSquare, colour):
+    #returns a dictionary mapping each pinned piece of colour to the squares it may still move to,
+    #which are the squares between the king and the pinning piece, plus the pinning piece itself
+    enemyColour = 'b' if colour == 'W' else 'W'
+    pawn, knight, bishop, rook, queen, king = pieceLetters(enemyColour)
+    allPieces = occupancy['W'] | occupancy['b']
+
+    #enemy sliders that would attack the king on an empty board
+    snipers = bishopAttacks(kingSquare, 0) & (bitboards[bishop] | bitboards[queen])
+    snipers |= rookAttacks(kingSquare, 0) & (bitboards[rook] | bitboards[queen])
+
+    pins = {}
+    for sniper in squares(snipers):
+        between = BETWEEN[kingSquare][sniper] & allPieces
+        #a piece is pinned if it is the only piece between the king and the sniper, and is friendly
+        if between and between & (between - 1) == 0 and between & occupancy[colour]:
+            pins[lowestSquare(between)] = BETWEEN[kingSquare][sniper] | (1 << sniper)
+    return pins
@@ -1,5 +1,5 @@
 import pygame
-import os
+import Source.assets as assets
 
 class Button:
     def __init__(self, name, pos, surface):
@@ -8,10 +8,10 @@ class Button:
         self.screen = surface
         ##boolean attribute tells program if button is being hovered over
         self.hover = False
-        ##load button asset
-        self.image = pygame.image.load(os.path.join(f'Assets/{self.name}-Button.png'))
-        ##load image of button when it is being hovered over
-        self.hoverImage = pygame.image.load(os.path.join(f'Assets/{self.name}-Hover.png'))
+        ##get button asset, which is only loaded from file once
+        self.image = assets.getImage(f'{self.name}-Button.png')
+        ##get image of button when it is being hovered over
+        self.hoverImage = assets.getImage(f'{self.name}-Hover.png')
     
     def is_hovering(self, event):
         hoverPos = event.pos
@@ -1,62 +1,131 @@
-import Source.const as const
 import Source.chessLogic as chessLogic
+import Source.transposition as transposition
+import Source.openingBook as openingBook
+import Source.tablebase as tablebase
+import Source.searchStats as searchStats
+import os
 import time
+import threading
+import itertools
 from copy import deepcopy
 
+#the default size of the transposition table in MB
+HASHSIZEMB = 16
+#the Polyglot opening book checked before searching. if there is no file at the path the AI always searches
+BOOKPATH = os.path.join("Assets", "book.bin")
+#whether book moves are picked at random in proportion to their weights, rather than always the heaviest
+BOOKWEIGHTED = True
+
+#whether each search keeps a SearchStats, and a file to add them to as JSON lines, or None for no log
+COLLECTSTATS = False
+STATSLOG = None
+#the default time the AI is given to choose a move, in seconds
+TIMELIMIT = 2.0
+#how many nodes are searched between checks of the clock
+CHECKINTERVAL = 256
+#the number of processes the root moves are split across. 1 searches in this process only
+WORKERS = 1
+#"selective" adds principal variation search, aspiration windows, null move pruning and late move
+#reductions to the alpha beta search. "fullwidth" is plain alpha beta, which searches every move to full depth
+SEARCHMODE = "selective"
+#the width of a zero window search. the board keeps its score in whole centipawns, and the evaluation is
+#that times 0.01, so two different scores are always close to 0.01 apart. but alpha + 0.01 can round to just
+#above the next score up, which would then fall inside the window, so the window is far narrower than that
+NULLWINDOW = 1e-6
+#how far either side of the last iteration's score the root search window starts, in pawns
+ASPIRATIONWINDOW = 0.5
+#how many plies shallower the search after a null move is
+NULLMOVEREDUCTION = 2
+#quiet moves after this many in the move order are searched with a reduced depth first
+LATEMOVEINDEX = 3
+#iterations shallower than this are searched in this process, as they finish faster than the work can be sent out
+PARALLELMINDEPTH = 3
+
+#piece values used to order captures, most valuable victim first, then least valuable attacker
+MVVLVAVALUES = {'p': 1, 'n': 3, 'b': 3, 'r': 5, 'q': 9, 'k': 10}
+#the score bands moves are sorted into. the principal variation and transposition table moves come first,
+#then queen promotions, captures, the killer moves and then quiet moves ordered by history
+PVSCORE = 4000000
+HASHSCORE = 3000000
+PROMOTIONSCORE = 2000000
+CAPTURESCORE = 1000000
+KILLERSCORE = 900000
+#in quiescence search, a capture is skipped if winning the captured piece plus this many pawns
+#could still not bring the score up to alpha
+DELTAMARGIN = 2
+
+class SearchStopped(Exception):
+    #raised inside the search when the time or node budget has run out
+    pass
+
 class ChessAI:
-    def __init__(self, board, colourToMove):
+    def __init__(self, board, colourToMove, transpositionTable=None, hashSizeMB=HASHSIZEMB):
         #board position on which the move will be generated
         self.board = board
         #the player for which a move will be generated
         self.colourToMove = colourToMove
         self.CHECKMATE = 100000
         self.STALEMATE = 0
-        self.DEPTH = 2
+        #a win found in the tablebases scores less than a checkmate found by the search. both are less
+        #the plies to mate from the root, so a quicker mate scores higher
+        self.TABLEBASEWIN = 50000
+        #scores within this many plies of CHECKMATE or TABLEBASEWIN are mates
+        self.MATEPLIES = 1000
+        #the search deepens one ply at a time until it runs out of time or nodes, or reaches MAXDEPTH
+        self.MAXDEPTH = 64
+        self.TIMELIMIT = TIMELIMIT
+        #a node limit of None means only the time limit is used
+        self.NODELIMIT = None
+        self.WORKERS = WORKERS
+        self.SEARCHMODE = SEARCHMODE
+        self.USEBOOK = True
+        self.BOOKPATH = BOOKPATH
+        self.BOOKWEIGHTED = BOOKWEIGHTED
+        self.USETABLEBASES = True
+        self.TABLEBASEPATH = tablebase.TABLEBASEPATH
+        #the tablebases probed by the search, set by getBestMove
+        self.tablebases = None
+        self.COLLECTSTATS = COLLECTSTATS
+        self.STATSLOG = STATSLOG
+        #the SearchStats of the last search, or None if stats are not collected
+        self.stats = None
+        #if set, called after every finished iteration with the depth, score, nodes searched and principal variation
+        self.iterationCallback = None
+        self.hashSizeMB = hashSizeMB
+        #set from another thread to stop the search, see stop()
+        self.stopped = False
+        #in a worker process, the event the main process sets to stop the worker's search,
+        #and the count of nodes searched by all of the workers, which is kept under nodeLimit
+        self.stopEvent = None
+        self.sharedNodes = None
+        #a number for the current search, given by getBestMove and sent to the workers with each root move
+        self.searchId = None
+        #while pondering the search has no deadline, until ponderHit() gives it one
+        self.pondering = False
+        #the time limit and deadline of the current search, given real values by getBestMove
+        self.timeLimit = self.TIMELIMIT
+        self.deadline = 0.0
+        #True while getBestMove is running, so a ponder hit after the search has finished does nothing
+        self.searching = False
+        #the principal variation of the last completed iteration, and the key of the position before each move
+        self.principalVariation = []
+        self.principalVariationKeys = []
+        #two quiet moves for each ply that caused a cut off, tried early in other positions at the same ply
+        self.killerMoves = [[None, None] for ply in range(self.MAXDEPTH + 1)]
+        #a score for each side and each pair of from and to squares, raised whenever a quiet move causes a cut off
+        self.historyTable = {colour: [0] * 4096 for colour in ('W', 'b')}
+        #a table can be passed in to keep it between moves, otherwise a new one of hashSizeMB is made
+        if transpositionTable is None:
+            transpositionTable = transposition.TranspositionTable(hashSizeMB)
+        self.transpositionTable = transpositionTable
         self.evalValue = self.evaluationFunction(self.board)
 
     
     #heuristic that describes whos winning
     def evaluationFunction(self, board):
-        boardStaticEval = 0
-        boardPosition = board.currentPos
-
-        def pieceValueTotal():
-            #the total value of all white pieces + black pieces
-            #default value is 0
-            summedBoardValue = 0
-
-            #the objective value of each piece, irrespective of position
-            objectivePieceValues = {
-                "K": 20000,
-                "Q": 900, 
-                "R": 500, 
-                "B": 330, 
-                "N": 320, 
-                "P": 100
-            }
-
-            #iterate through the board
-            for row in range(0,8):
-                for col in range(0,8):
-                    searchedSquare = boardPosition[row][col]
-                    #if there is a piece
-                    if searchedSquare != '':
-                        #get the objective piece value by type
-                        pieceType = searchedSquare.upper()
-                        objPieceVal = objectivePieceValues[pieceType]
-                        if searchedSquare.isupper():
-                            #gets the piece square table bonus
-                            piecePositionBonus = const.positionPieceValues[pieceType][row][col]
-                            #adds to the summed board value
-                            summedBoardValue += (objPieceVal+piecePositionBonus)
-                        else:
-                            #reverses the piece square table if the piece is black
-                            piecePositionBonus = const.positionPieceValues[pieceType][::-1][row][col]
-                            #subtracts from the summed board value
-                            summedBoardValue -= (objPieceVal+piecePositionBonus)
-                        
-
-            return summedBoardValue
+        #the board keeps the total of every piece's value and piece square bonus up to date
+        #as moves are made and undone, so the squares do not need to be looked at here
+        pieceValueTotal = board.evalScore
         '''
             Below are my pawn structure and king safety functions. These were omitted from my final product, so are commented out.
         '''
@@ -120,74 +189,679 @@ class ChessAI:
         a,b,c = 1,0.1,0.1
 
         #board eval is calculated and returned.
-        boardStaticEval = 0.01*a*pieceValueTotal()
-        isGameOver = board.isGameOver()
-        
-        if isGameOver[0]:
-            #black wins
-            match isGameOver[1]:
-                case 'W':
-                    return -self.CHECKMATE
-                case 'b':
-                    #white wins
-                    return self.CHECKMATE
-                case '':
-                    return self.STALEMATE
-        
+        #checkmate and stalemate are found by the search, when a position has no legal moves
+        boardStaticEval = 0.01*a*pieceValueTotal
         return boardStaticEval
 
 
+    def isQuietMove(self, board, move):
+        #a quiet move is not a capture or a promotion
+        flag = move >> 12
+        if flag == chessLogic.ENPASSANT or flag >= chessLogic.PROMOTION:
+            return False
+        row, col = chessLogic.getMoveFinal(move)
+        return board.currentPos[row][col] == ''
+
+    def orderMoves(self, board, legalMoves, hashMove, pvMove=None, ply=0):
+        #sorts the moves so the ones most likely to cause a cut off are searched first
+        pos = board.currentPos
+        killers = self.killerMoves[ply]
+        history = self.historyTable[board.playerToMove]
+
+        def moveScore(move):
+            if move == pvMove:
+                return PVSCORE
+            if move == hashMove:
+                return HASHSCORE
+            flag = move >> 12
+            finalRow, finalCol = chessLogic.getMoveFinal(move)
+            victim = pos[finalRow][finalCol]
+            #promotions to a queen come before every capture, underpromotions after every quiet move
+            if flag >= chessLogic.PROMOTION:
+                if flag == chessLogic.PROMOTION:
+                    return PROMOTIONSCORE + (MVVLVAVALUES[victim.lower()] if victim != '' else 0)
+                return -(flag - chessLogic.PROMOTION)
+            #en passant always takes a pawn with a pawn
+            if flag == chessLogic.ENPASSANT:
+                return CAPTURESCORE + 10*MVVLVAVALUES['p'] - MVVLVAVALUES['p']
+            if victim != '':
+                initialRow, initialCol = chessLogic.getMoveInitial(move)
+                attacker = pos[initialRow][initialCol]
+                return CAPTURESCORE + 10*MVVLVAVALUES[victim.lower()] - MVVLVAVALUES[attacker.lower()]
+            if move == killers[0]:
+                return KILLERSCORE + 1
+            if move == killers[1]:
+                return KILLERSCORE
+            #history scores are kept below the killer moves
+            return min(history[move & 4095], KILLERSCORE - 1)
+
+        return sorted(legalMoves, key=moveScore, reverse=True)
+
+    def updateQuietCutoff(self, board, move, depth, ply):
+        #a quiet move that caused a cut off becomes a killer move for its ply, and gains history
+        killers = self.killerMoves[ply]
+        if killers[0] != move:
+            killers[1] = killers[0]
+            killers[0] = move
+        #deeper cut offs save more work, so they are given more weight
+        self.historyTable[board.playerToMove][move & 4095] += depth * depth
+
+    def getPVMove(self, board, ply):
+        #the principal variation move for this ply, if the search is still following the principal variation
+        if ply < len(self.principalVariationKeys) and self.principalVariationKeys[ply] == board.zobristKey:
+            return self.principalVariation[ply]
+        return None
+
+    def stop(self):
+        #asks a search running on another thread to stop. getBestMove then returns as soon as it can
+        self.stopped = True
+
+    def ponderHit(self):
+        #the move that was pondered on has been played, so the search now gets its normal time limit.
+        #the deadline is set before pondering is turned off, so the search never sees an old deadline
+        if not self.searching:
+            self.pondering = False
+            return
+        self.deadline = time.perf_counter() + self.timeLimit
+        self.pondering = False
+
+    def checkBudget(self):
+        #counts a node, and stops the search once the time or node budget is used up
+        self.nodes += 1
+        if self.stopped:
+            raise SearchStopped()
+        #the first iteration is always finished, so there is a move to return
+        if self.completedDepth == 0:
+            return
+        if self.nodeLimit is not None and self.nodes >= self.nodeLimit:
+            raise SearchStopped()
+        if self.nodes % CHECKINTERVAL == 0:
+            if time.perf_counter() >= self.deadline and not self.pondering:
+                raise SearchStopped()
+            if self.stopEvent is not None and self.stopEvent.is_set():
+                raise SearchStopped()
+            if self.sharedNodes is not None and self.nodeLimit is not None:
+                with self.sharedNodes.get_lock():
+                    self.sharedNodes.value += CHECKINTERVAL
+                    sharedNodes = self.sharedNodes.value
+                if sharedNodes >= self.nodeLimit:
+                    raise SearchStopped()
+
+    def getTablebaseScore(self, board, ply=0):
+        #the score of a position from the tablebases, for the side to move, or None if it is not in them.
+        #quicker mates score higher, so the search heads for the shortest win and the longest loss.
+        #ply is how far the position is from the root, so the score counts the plies to mate from the root
+        entry = self.tablebases.probe(board)
+        if entry is None:
+            return None
+        result, plies = entry
+        if result == 0:
+            return self.STALEMATE
+        return result * (self.TABLEBASEWIN - plies - ply)
+
+    def scoreToTable(self, score, ply):
+        #a mate score counts the plies from the root, but the same position can be reached at a different
+        #ply. so mates are stored in the transposition table counting the plies from the position itself
+        if score > self.TABLEBASEWIN - self.MATEPLIES:
+            return score + ply
+        if score < -(self.TABLEBASEWIN - self.MATEPLIES):
+            return score - ply
+        return score
+
+    def scoreFromTable(self, score, ply):
+        #turns a mate score from the transposition table back into the plies from the root
+        if score > self.TABLEBASEWIN - self.MATEPLIES:
+            return score - ply
+        if score < -(self.TABLEBASEWIN - self.MATEPLIES):
+            return score + ply
+        return score
+
+    def getTablebaseMove(self, board, legalMoves):
+        #picks the move with the best result in the tablebases: the quickest win, otherwise a draw,
+        #otherwise the slowest loss. returns None if the position or any move cannot be probed
+        if self.tablebases.probe(board) is None:
+            return None
+        bestMove = None
+        bestScore = float("-inf")
+        for move in legalMoves:
+            board.makeFullMove(move)
+            score = self.getTablebaseScore(board)
+            board.undoMove()
+            if score is None:
+                return None
+            if -score > bestScore:
+                bestScore = -score
+                bestMove = move
+        return bestMove
+
+    #whether a side has a knight, bishop, rook or queen, used to decide whether null move pruning is safe
+    def hasNonPawnMaterial(self, board, colour):
+        #in endgames with only kings and pawns, zugzwang is common, so passing the turn is not a safe guess
+        pieces = ('N', 'B', 'R', 'Q') if colour == 'W' else ('n', 'b', 'r', 'q')
+        return any(board.pieceSquares[piece] for piece in pieces)
+
     #searches at a depth, using minimax and alpha beta
-    def search(self, board, depth, alpha, beta, colourMultiplier):
+    def search(self, board, depth, alpha, beta, colourMultiplier, ply=1, allowNullMove=True):
+        self.checkBudget()
         #base case for recursive routine
-        #if the depth has reached the end, or the game is over
-        if depth == 0 or board.isGameOver()[0]:
-            #returns the evaluation of the board 
-            return colourMultiplier * self.evaluationFunction(board)
+        #once the depth has reached the end, captures are played out until the position is quiet
+        if depth <= 0:
+            return self.quiescence(board, alpha, beta, colourMultiplier)
+        #positions in the endgame tablebases have a known result, so are not searched
+        if self.tablebases is not None and self.tablebases.available:
+            tablebaseScore = self.getTablebaseScore(board, ply)
+            if tablebaseScore is not None:
+                if self.stats is not None:
+                    self.stats.tablebaseHits += 1
+                return tablebaseScore
+        #stats are only counted if they are being collected
+        stats = self.stats
+        #looks the position up in the transposition table
+        originalAlpha = alpha
+        hashMove = None
+        entry = self.transpositionTable.probe(board.zobristKey)
+        if stats is not None:
+            stats.hashProbes += 1
+        if entry is not None:
+            entryDepth, entryScore, entryBound, hashMove = entry
+            entryScore = self.scoreFromTable(entryScore, ply)
+            if stats is not None:
+                stats.hashHits += 1
+            #the stored score can only be used if it was searched at least as deep
+            if entryDepth >= depth:
+                if entryBound == transposition.EXACT:
+                    if stats is not None:
+                        stats.hashCutoffs += 1
+                    return entryScore
+                elif entryBound == transposition.LOWERBOUND:
+                    alpha = max(alpha, entryScore)
+                else:
+                    beta = min(beta, entryScore)
+                if alpha >= beta:
+                    if stats is not None:
+                        stats.hashCutoffs += 1
+                    return entryScore
+
+        moveGen = chessLogic.MoveGenerator(board)
+        inCheck = moveGen.isInCheck(board, board.playerToMove)
+        selective = self.SEARCHMODE == "selective"
+        #a node searched with a full window can become part of the principal variation
+        isPVNode = beta - alpha > NULLWINDOW * 1.5
+
+        #NULL MOVE PRUNING
+        #if the side to move could pass and a reduced search still fails high, a real move almost
+        #certainly would too. not tried in check, twice in a row, on the principal variation, or without pieces
+        if (selective and allowNullMove and not isPVNode and not inCheck and depth >= 3
+                and colourMultiplier * self.evaluationFunction(board) >= beta
+                and self.hasNonPawnMaterial(board, board.playerToMove)):
+            board.makeNullMove()
+            nullScore = -self.search(board, depth - 1 - NULLMOVEREDUCTION, -beta, -beta + NULLWINDOW, -colourMultiplier, ply + 1, False)
+            board.undoNullMove()
+            if nullScore >= beta:
+                if stats is not None:
+                    stats.nullMoveCutoffs += 1
+                #a mate found after passing is not real, so only the bound is returned
+                return beta
 
         #arbitrarily small number, will never be exceeded in magnitude by evaluation function
         maxScore = float("-inf")
+        bestMove = None
         #gets all of the legal moves for the searched node
-        legalMoves = chessLogic.getAllLegalMoves(board)
+        legalMoves = moveGen.getLegalMoves()
+        #with no legal moves the game is over. it is checkmate if the player is in check, otherwise stalemate
+        if len(legalMoves) == 0:
+            #a mate is scored by how many plies from the root it is, so the search prefers the quickest mate
+            if inCheck:
+                return -(self.CHECKMATE - ply)
+            return self.STALEMATE
+        legalMoves = self.orderMoves(board, legalMoves, hashMove, self.getPVMove(board, ply), ply)
 
         #for each move in the legally generated moves
-        for move in legalMoves:
+        for moveIndex, move in enumerate(legalMoves):
+            isQuiet = self.isQuietMove(board, move)
 
             #makes a move, recurses, and then undoes the move
             board.makeFullMove(move)
-            score = -self.search(board, depth - 1, -beta, -alpha, -colourMultiplier)
+            if not selective or moveIndex == 0:
+                score = -self.search(board, depth - 1, -beta, -alpha, -colourMultiplier, ply + 1)
+            else:
+                #PRINCIPAL VARIATION SEARCH
+                #the first move is expected to be best, so the others are only searched with a zero window
+                #to show they are no better. a move that is better is searched again with the full window
+                reduction = 0
+                #LATE MOVE REDUCTIONS
+                #quiet moves late in the order rarely matter, so they are searched shallower first.
+                #captures, promotions, checks and moves out of check are never reduced
+                if (isQuiet and depth >= 3 and moveIndex >= LATEMOVEINDEX and not inCheck
+                        and not moveGen.isInCheck(board, board.playerToMove)):
+                    reduction = 2 if moveIndex >= 2 * LATEMOVEINDEX and depth >= 6 else 1
+                score = -self.search(board, depth - 1 - reduction, -alpha - NULLWINDOW, -alpha, -colourMultiplier, ply + 1)
+                #a reduced move that beats alpha is searched again at full depth
+                if reduction > 0 and score > alpha:
+                    score = -self.search(board, depth - 1, -alpha - NULLWINDOW, -alpha, -colourMultiplier, ply + 1)
+                if alpha < score < beta:
+                    score = -self.search(board, depth - 1, -beta, -alpha, -colourMultiplier, ply + 1)
             board.undoMove()
 
             #updates max score
-            maxScore = max(maxScore, score)
+            if score > maxScore:
+                maxScore = score
+                bestMove = move
             #updates alpha, to cut off unnecessary nodes in the tree
             alpha = max(alpha, score)
+            if alpha >= beta:
+                if isQuiet:
+                    self.updateQuietCutoff(board, move, depth, ply)
+                if stats is not None:
+                    stats.betaCutoffs += 1
+                    if moveIndex == 0:
+                        stats.firstMoveCutoffs += 1
+                break
+
+        #stores the result, with the bound depending on where the score fell compared to the window
+        if maxScore <= originalAlpha:
+            bound = transposition.UPPERBOUND
+        elif maxScore >= beta:
+            bound = transposition.LOWERBOUND
+        else:
+            bound = transposition.EXACT
+        self.transpositionTable.store(board.zobristKey, depth, self.scoreToTable(maxScore, ply), bound, bestMove)
+
+        return maxScore
+
+    #searches only captures and promotions, so the search never stops in the middle of an exchange
+    def quiescence(self, board, alpha, beta, colourMultiplier):
+        self.checkBudget()
+        if self.stats is not None:
+            self.stats.quiescenceNodes += 1
+        #the side to move does not have to capture, so the static evaluation is a lower bound on its score.
+        #this is called standing pat
+        standPat = colourMultiplier * self.evaluationFunction(board)
+        if standPat >= beta:
+            return standPat
+        #delta pruning: if even winning a queen would leave the score below alpha, no capture can help
+        if standPat + MVVLVAVALUES['q'] + DELTAMARGIN < alpha:
+            return standPat
+        alpha = max(alpha, standPat)
+        maxScore = standPat
+
+        #the capture stage of the move generator gives captures, en passant and promotions
+        captureMoves = chessLogic.MoveGenerator(board).getCaptureMoves()
+        for move in self.orderMoves(board, captureMoves, None):
+            #delta pruning: captures that could not raise the score to alpha are skipped.
+            #promotions are never skipped, as they also gain the promoted piece
+            if move >> 12 < chessLogic.PROMOTION:
+                finalRow, finalCol = chessLogic.getMoveFinal(move)
+                victim = board.currentPos[finalRow][finalCol]
+                gain = MVVLVAVALUES[victim.lower()] if victim != '' else MVVLVAVALUES['p']
+                if standPat + gain + DELTAMARGIN < alpha:
+                    continue
+
+            board.makeFullMove(move)
+            score = -self.quiescence(board, -beta, -alpha, -colourMultiplier)
+            board.undoMove()
+
+            if score > maxScore:
+                maxScore = score
+            alpha = max(alpha, score)
             if alpha >= beta:
                 break
 
         return maxScore
 
-    def getBestMove(self, board, legalMoves):
+    def searchRoot(self, board, legalMoves, depth, colourMultiplier, alpha=float("-inf"), beta=float("inf")):
         #initially the best move is None
         bestMove = None
         #arbitrarily large numbers 
         maxScore = float("-inf")
-        alpha = float("-inf")
-        beta = float("inf")
-        #colour multiplier is 1 for white, and -1 for black. This is applied to the evaluation function
-        colourMultiplier = 1 if board.playerToMove == 'W' else -1
+        originalAlpha = alpha
+        entry = self.transpositionTable.probe(board.zobristKey)
+        hashMove = entry[3] if entry is not None else None
         #for each legal move
-        for move in legalMoves:
+        for moveIndex, move in enumerate(self.orderMoves(board, legalMoves, hashMove, self.getPVMove(board, 0))):
             #makes the move, then finds the max score in the position, and then undoes the move
-            tempBoard = deepcopy(board)
             board.makeFullMove(move)
-            score = -self.search(board, self.DEPTH - 1, -beta, -alpha, -colourMultiplier)
-            board = deepcopy(tempBoard)
+            if self.SEARCHMODE == "selective" and moveIndex > 0:
+                #principal variation search, the same as in search()
+                score = -self.search(board, depth - 1, -alpha - NULLWINDOW, -alpha, -colourMultiplier)
+                if alpha < score < beta:
+                    score = -self.search(board, depth - 1, -beta, -alpha, -colourMultiplier)
+            else:
+                score = -self.search(board, depth - 1, -beta, -alpha, -colourMultiplier)
+            board.undoMove()
             #iteratively finds the best move, by comparing the actual scores to the max score.
             if score > maxScore:
                 maxScore = score
                 bestMove = move
             alpha = max(alpha, score)
+            if alpha >= beta:
+                break
+
+        #the root score is only exact if it fell inside the window
+        if bestMove is not None and originalAlpha < maxScore < beta:
+            self.transpositionTable.store(board.zobristKey, depth, maxScore, transposition.EXACT, bestMove)
+        return bestMove, maxScore
+
+    def searchRootParallel(self, board, legalMoves, depth, colourMultiplier):
+        #searches the first root move here to get a score to beat, then the other root moves are
+        #split across the worker processes. each only needs to show whether it beats that score,
+        #so the best move is the same as searchRoot would find.
+        #returns the best move, its score, and its principal variation if a worker found it, otherwise None
+        entry = self.transpositionTable.probe(board.zobristKey)
+        hashMove = entry[3] if entry is not None else None
+        orderedMoves = self.orderMoves(board, legalMoves, hashMove, self.getPVMove(board, 0))
+
+        bestMove = orderedMoves[0]
+        board.makeFullMove(bestMove)
+        maxScore = -self.search(board, depth - 1, float("-inf"), float("inf"), -colourMultiplier)
+        board.undoMove()
+        line = None
+
+        otherMoves = orderedMoves[1:]
+        if otherMoves:
+            fen = board.fen
+            #the workers share what is left of the node budget, counting their nodes together in workerNodes
+            remainingNodes = None if self.nodeLimit is None else max(self.nodeLimit - self.nodes, 1)
+            settings = (self.SEARCHMODE, self.USETABLEBASES, self.TABLEBASEPATH, self.hashSizeMB)
+            pool = getWorkerPool(self.WORKERS)
+            workerNodes.value = 0
+            #the workers have no deadline of their own. the clock, stop() and ponderHit() are all watched
+            #here, and the workers are stopped through workerStopEvent
+            futures = [pool.submit(searchRootMove, fen, move, depth, maxScore, remainingNodes, settings, self.searchId) for move in otherMoves]
+            results = self.waitForWorkers(futures)
+            for move, (score, nodes, workerLine) in zip(otherMoves, results):
+                #a score above the one to beat is exact. moves are taken in order, so ties keep the earlier move
+                if score > maxScore:
+                    maxScore = score
+                    bestMove = move
+                    line = [move] + workerLine
+
+        self.transpositionTable.store(board.zobristKey, depth, maxScore, transposition.EXACT, bestMove)
+        return bestMove, maxScore, line
+
+    def waitForWorkers(self, futures):
+        #waits for the root moves sent to the workers, checking the budget while it waits.
+        #returns each move's (score, nodes, principal variation), or raises SearchStopped if the iteration can not finish
+        from concurrent.futures import wait, FIRST_COMPLETED
+        pending = set(futures)
+        stopped = False
+        while pending and not stopped:
+            done, pending = wait(pending, timeout=WORKERPOLLTIME, return_when=FIRST_COMPLETED)
+            #a worker that ran out of nodes means the iteration did not finish
+            stopped = any(future.result()[0] is None for future in done)
+            stopped = stopped or self.stopped or (time.perf_counter() >= self.deadline and not self.pondering)
+        if stopped:
+            #moves not started yet are dropped, and the workers searching are told to stop. the event is only
+            #cleared once they have all returned, so none of them carries on with the next iteration's work
+            for future in pending:
+                future.cancel()
+            workerStopEvent.set()
+            wait(pending)
+            workerStopEvent.clear()
+        for future in futures:
+            if not future.cancelled():
+                self.nodes += future.result()[1]
+        if stopped:
+            raise SearchStopped()
+        return [future.result() for future in futures]
+
+    def getPrincipalVariation(self, board, depth, line=None):
+        #follows the best moves stored in the transposition table from the root, or the moves of line if it is given.
+        #returns the moves, and the key of the position each one is played from
+        moves = []
+        keys = []
+        while len(moves) < depth:
+            if line is not None:
+                move = line[len(moves)] if len(moves) < len(line) else None
+            else:
+                entry = self.transpositionTable.probe(board.zobristKey)
+                move = entry[3] if entry is not None else None
+            if move is None or move not in chessLogic.getAllLegalMoves(board):
+                break
+            moves.append(move)
+            keys.append(board.zobristKey)
+            board.makeFullMove(move)
+        for move in moves:
+            board.undoMove()
+        return moves, keys
+
+    def getBestMove(self, board, legalMoves, timeLimit=None, nodeLimit=None):
+        #the move can come from the book, the tablebases or the search, but however it is found,
+        #once it is returned the search is over and is no longer pondering
+        self.searching = True
+        try:
+            return self.chooseMove(board, legalMoves, timeLimit, nodeLimit)
+        finally:
+            self.searching = False
+            self.pondering = False
+
+    def chooseMove(self, board, legalMoves, timeLimit, nodeLimit):
+        #searches one ply deeper each iteration, until the time or node budget runs out.
+        #the move returned is always the best move of the last iteration that finished
+        if len(legalMoves) == 0:
+            return None
+        self.nodes = 0
+        self.completedDepth = 0
+        self.bestScore = None
+        self.principalVariation = []
+        self.principalVariationKeys = []
+        self.stats = searchStats.SearchStats(board.fen) if self.COLLECTSTATS else None
+
+        #a move from the opening book is played without searching
+        if self.USEBOOK:
+            bookMove = openingBook.getBook(self.BOOKPATH).getMove(board, self.BOOKWEIGHTED)
+            if bookMove is not None and bookMove in legalMoves:
+                self.finishStats(bookMove, "book")
+                return bookMove
+
+        #in an endgame in the tablebases, the best move is known without searching
+        self.tablebases = tablebase.getTablebases(self.TABLEBASEPATH) if self.USETABLEBASES else None
+        if self.tablebases is not None and self.tablebases.available:
+            tablebaseMove = self.getTablebaseMove(board, legalMoves)
+            if tablebaseMove is not None:
+                self.bestScore = self.getTablebaseScore(board)
+                self.finishStats(tablebaseMove, "tablebase")
+                return tablebaseMove
+
+        if timeLimit is None:
+            timeLimit = self.TIMELIMIT
+        self.timeLimit = timeLimit
+        self.nodeLimit = nodeLimit if nodeLimit is not None else self.NODELIMIT
+        self.deadline = time.perf_counter() + timeLimit
+        self.killerMoves = [[None, None] for ply in range(self.MAXDEPTH + 1)]
+        #colour multiplier is 1 for white, and -1 for black. This is applied to the evaluation function
+        colourMultiplier = 1 if board.playerToMove == 'W' else -1
+        #entries from earlier searches are replaced first
+        self.transpositionTable.newSearch()
+        #tells the workers which search their root moves belong to, so they also age their tables once per search
+        self.searchId = next(searchIds)
+        #the number of moves on the board, so a stopped search can take back the moves it made
+        undoDepth = len(board.undoStack)
+
+        bestMove = legalMoves[0]
+        for depth in range(1, self.MAXDEPTH + 1):
+            #the principal variation found by a worker, which is not in this process's table
+            line = None
+            try:
+                if self.WORKERS > 1 and depth >= PARALLELMINDEPTH and len(legalMoves) > 1:
+                    move, score, line = self.searchRootParallel(board, legalMoves, depth, colourMultiplier)
+                elif self.SEARCHMODE == "selective" and depth > 1 and abs(self.bestScore) < self.CHECKMATE - self.MATEPLIES:
+                    #ASPIRATION WINDOWS
+                    #the score is expected to be close to the last iteration's, so the search starts with a
+                    #narrow window around it. if the score falls outside, it is searched again with a full window
+                    alpha = self.bestScore - ASPIRATIONWINDOW
+                    beta = self.bestScore + ASPIRATIONWINDOW
+                    move, score = self.searchRoot(board, legalMoves, depth, colourMultiplier, alpha, beta)
+                    if score <= alpha or score >= beta:
+                        move, score = self.searchRoot(board, legalMoves, depth, colourMultiplier)
+                else:
+                    move, score = self.searchRoot(board, legalMoves, depth, colourMultiplier)
+            except SearchStopped:
+                #the unfinished iteration is thrown away
+                while len(board.undoStack) > undoDepth:
+                    board.undoMove()
+                break
+            bestMove = move
+            self.bestScore = score
+            self.completedDepth = depth
+            #the principal variation orders the moves of the next iteration
+            self.principalVariation, self.principalVariationKeys = self.getPrincipalVariation(board, depth, line)
+            if self.stats is not None:
+                self.stats.addIteration(depth, score, self.nodes, [chessLogic.getMoveName(pvMove) for pvMove in self.principalVariation])
+            if self.iterationCallback is not None:
+                self.iterationCallback(depth, score, self.nodes, self.principalVariation)
+
+            #there is nothing to choose between with only one move, and nothing better than a forced mate
+            if len(legalMoves) == 1 or abs(score) > self.CHECKMATE - self.MATEPLIES:
+                break
+            #the next iteration takes several times longer than this one, so it is not started
+            #if it would be unlikely to finish before the deadline
+            if not self.pondering and self.deadline - time.perf_counter() <= self.timeLimit / 2:
+                break
+            if self.stopped:
+                break
 
+        self.finishStats(bestMove, "search")
         #returns the best move
         return bestMove
+
+    def finishStats(self, bestMove, source):
+        #fills in the totals once the move is chosen, and adds them to the log if there is one
+        if self.stats is None:
+            return
+        self.stats.source = source
+        principalVariation = [chessLogic.getMoveName(move) for move in self.principalVariation]
+        self.stats.finish(self.nodes, chessLogic.getMoveName(bestMove), self.bestScore, principalVariation)
+        if self.STATSLOG is not None:
+            self.stats.writeLog(self.STATSLOG)
+
+
+class BackgroundSearch:
+    #runs getBestMove on a thread, so the game loop keeps drawing and handling input while the AI thinks.
+    #if ponderMove is given, the search is on the position after that move, and has no time limit
+    #until ponderHit() is called, so it can use the opponent's thinking time
+    def __init__(self, board, transpositionTable=None, timeLimit=None, ponderMove=None):
+        #the search makes and undoes moves, so it runs on its own copy of the board
+        self.board = deepcopy(board)
+        self.ponderMove = ponderMove
+        if ponderMove is not None:
+            self.board.makeFullMove(ponderMove)
+        #the key of the position being searched, so the caller can tell whether it is still wanted
+        self.key = self.board.zobristKey
+        self.chessAI = ChessAI(self.board, self.board.playerToMove, transpositionTable)
+        self.chessAI.pondering = ponderMove is not None
+        self.bestMove = None
+        self.thread = threading.Thread(target=self.run, args=(timeLimit,), daemon=True)
+        self.thread.start()
+
+    def run(self, timeLimit):
+        legalMoves = chessLogic.getAllLegalMoves(self.board)
+        self.bestMove = self.chessAI.getBestMove(self.board, legalMoves, timeLimit)
+
+    @property
+    def pondering(self):
+        return self.chessAI.pondering
+
+    def ponderHit(self):
+        self.chessAI.ponderHit()
+
+    def isFinished(self):
+        return not self.thread.is_alive()
+
+    def getExpectedReply(self):
+        #the opponent's reply to the best move from the principal variation, or None
+        principalVariation = self.chessAI.principalVariation
+        return principalVariation[1] if len(principalVariation) > 1 else None
+
+    def cancel(self):
+        #stops the search and waits for the thread to finish
+        self.chessAI.stop()
+        self.thread.join()
+
+
+#PARALLEL ROOT SEARCH
+#the worker pools, one for each number of workers, kept so the processes are only started once
+workerPools = {}
+#set by the main process to stop the searches running in every worker, and the nodes searched by
+#all of the workers in an iteration. they are shared with the workers when their pool is started,
+#as they can not be sent to a worker with each move
+workerStopEvent = None
+workerNodes = None
+#how often the main process checks the clock and stop() while the workers search, in seconds
+WORKERPOLLTIME = 0.01
+#a number for each call of getBestMove, see searchRootMove
+searchIds = itertools.count()
+
+def getWorkerPool(workers):
+    global workerStopEvent, workerNodes
+    if workers not in workerPools:
+        #imported here, as loading the process pool code takes longer than the rest of the engine
+        import multiprocessing
+        from concurrent.futures import ProcessPoolExecutor
+        #the workers are spawned rather than forked. the pool is first used from a search thread, and a
+        #process forked while another thread holds a lock, such as the UCI loop reading stdin, can deadlock
+        context = multiprocessing.get_context("spawn")
+        if workerStopEvent is None:
+            workerStopEvent = context.Event()
+            workerNodes = context.Value('q', 0)
+        workerPools[workers] = ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=setWorkerShared, initargs=(workerStopEvent, workerNodes))
+    return workerPools[workers]
+
+def setWorkerShared(stopEvent, nodes):
+    #runs in each worker process as it starts
+    global workerStopEvent, workerNodes
+    workerStopEvent = stopEvent
+    workerNodes = nodes
+
+#each worker process keeps one ChessAI, so its transposition table carries over between the moves it is given
+workerAI = None
+#the searchId of the last root move the worker was given
+workerSearchId = None
+
+def searchRootMove(fen, move, depth, scoreToBeat, nodeLimit, settings, searchId):
+    #runs in a worker process. searches one root move, rebuilding the board from the FEN as boards are
+    #not shared between processes. settings are the search mode, tablebase use and path, and hash size
+    #of the ChessAI in the main process, as they can change between moves.
+    #searchId is the getBestMove call the move is from, as the table is only aged when a new search starts.
+    #returns (score, nodes searched, principal variation after the move), with a score of None if the search was stopped
+    global workerAI, workerSearchId
+    searchMode, useTablebases, tablebasePath, hashSizeMB = settings
+    #a move that only starts once the search was stopped, or the other workers used up the nodes, is not searched
+    if workerStopEvent.is_set() or (nodeLimit is not None and workerNodes.value >= nodeLimit):
+        return None, 0, []
+    board = chessLogic.Board(fen)
+    #the table is only made again if its size changed, so it keeps its entries between moves
+    if workerAI is None or workerAI.hashSizeMB != hashSizeMB:
+        workerAI = ChessAI(board, board.playerToMove, hashSizeMB=hashSizeMB)
+        workerAI.stopEvent = workerStopEvent
+        workerAI.sharedNodes = workerNodes
+    workerAI.SEARCHMODE = searchMode
+    workerAI.tablebases = tablebase.getTablebases(tablebasePath) if useTablebases else None
+    #entries from the other root moves of the same search are as useful as this move's, so are not aged
+    if searchId != workerSearchId:
+        workerAI.transpositionTable.newSearch()
+        workerSearchId = searchId
+    #the main process decides when the search is out of time, and sets workerStopEvent
+    workerAI.deadline = float("inf")
+    workerAI.nodeLimit = nodeLimit
+    workerAI.nodes = 0
+    #the budget is checked from the first node, as the caller already has a move to fall back on
+    workerAI.completedDepth = 1
+    workerAI.principalVariation = []
+    workerAI.principalVariationKeys = []
+    colourMultiplier = 1 if board.playerToMove == 'W' else -1
+
+    board.makeFullMove(move)
+    line = []
+    try:
+        #only scores above scoreToBeat matter, so anything at or below it can be cut off early
+        score = -workerAI.search(board, depth - 1, float("-inf"), -scoreToBeat, -colourMultiplier)
+        #the search below the move has a window that is open at the bottom, so a move that beats
+        #scoreToBeat has exact scores and best moves in the table, which give its principal variation
+        line = workerAI.getPrincipalVariation(board, depth - 1)[0]
+    except SearchStopped:
+        score = None
+    #checkBudget adds to workerNodes every CHECKINTERVAL nodes, so the nodes since the last check are added here
+    with workerNodes.get_lock():
+        workerNodes.value += workerAI.nodes % CHECKINTERVAL
+    return score, workerAI.nodes, line
@@ -1,4 +1,8 @@
 from copy import deepcopy
+from array import array
+import Source.bitboard as bitboard
+import Source.zobrist as zobrist
+import Source.const as const
 
 def fenParse(FEN):
         ##split FEN into rows by using split function
@@ -22,94 +26,343 @@ def fenParse(FEN):
         board = [expand(row) for row in boardRows]
         return board
 
+#the castling letters in a FEN, and the bit each one has in a board's castling rights
+CASTLINGLETTERS = {'K': 1, 'Q': 2, 'k': 4, 'q': 8}
+
+def parseFEN(FEN):
+    #reads every field of a FEN. returns the position, the side to move, the castling rights,
+    #the en passant square (or None) and the halfmove and fullmove clocks.
+    #fields missing from the end of the FEN are given defaults, so a placement on its own still loads.
+    fenParts = FEN.split()
+    position = fenParse(FEN)
+    playerToMove = 'b' if len(fenParts) > 1 and fenParts[1] == 'b' else 'W'
+
+    if len(fenParts) > 2:
+        castlingRights = 0
+        for char in fenParts[2]:
+            castlingRights |= CASTLINGLETTERS.get(char, 0)
+    else:
+        #without a castling field, castling is allowed where the king and rook are on their starting squares
+        castlingRights = getHomeCastlingRights(position)
+
+    enPassantSquare = None
+    if len(fenParts) > 3 and fenParts[3] != '-':
+        enPassantSquare = bitboard.squareOf(8 - int(fenParts[3][1]), 'abcdefgh'.index(fenParts[3][0]))
+
+    halfmoveClock = int(fenParts[4]) if len(fenParts) > 4 else 0
+    fullmoveNumber = int(fenParts[5]) if len(fenParts) > 5 else 1
+    return position, playerToMove, castlingRights, enPassantSquare, halfmoveClock, fullmoveNumber
+
+def getHomeCastlingRights(position):
+    #castling rights for a position with no history, allowed while the king and rook are on their starting squares
+    rights = 0
+    if position[7][4] == 'K':
+        if position[7][7] == 'R':
+            rights |= 1
+        if position[7][0] == 'R':
+            rights |= 2
+    if position[0][4] == 'k':
+        if position[0][7] == 'r':
+            rights |= 4
+        if position[0][0] == 'r':
+            rights |= 8
+    return rights
+
+#the castling rights kept when a move starts or ends on each square.
+#a move to or from a king or rook starting square loses the rights that piece was needed for
+CASTLINGMASKS = [15] * 64
+CASTLINGMASKS[bitboard.squareOf(7,4)] = 15 ^ (1 | 2)
+CASTLINGMASKS[bitboard.squareOf(7,7)] = 15 ^ 1
+CASTLINGMASKS[bitboard.squareOf(7,0)] = 15 ^ 2
+CASTLINGMASKS[bitboard.squareOf(0,4)] = 15 ^ (4 | 8)
+CASTLINGMASKS[bitboard.squareOf(0,7)] = 15 ^ 4
+CASTLINGMASKS[bitboard.squareOf(0,0)] = 15 ^ 8
+
+#MOVE ENCODING
+#a move is a 16 bit int. bits 0-5 hold the starting square, bits 6-11 the target square and bits 12-15
+#a flag for the type of move. squares are numbered as in bitboard.py, so square = row*8 + col.
+NORMAL = 0
+ENPASSANT = 1
+CASTLINGK = 2
+CASTLINGQ = 3
+#promotion flags are PROMOTION plus the index of the piece in PROMOTIONPIECES
+PROMOTION = 4
+
+#the pieces a pawn can promote to, queen first so it is the first one tried
+PROMOTIONPIECES = ["q", "r", "b", "n"]
+
+#the move type name for each flag
+MOVETYPES = ["normal", "en passant", "castlingK", "castlingQ", "promotion", "promotion", "promotion", "promotion"]
+
+def encodeMove(fromSquare, toSquare, flag=NORMAL):
+    return fromSquare | (toSquare << 6) | (flag << 12)
+
+def getMoveInitial(move):
+    #the (row, col) the move starts on
+    return bitboard.COORDS[move & 63]
+
+def getMoveFinal(move):
+    #the (row, col) the move ends on
+    return bitboard.COORDS[(move >> 6) & 63]
+
+def getMoveType(move):
+    return MOVETYPES[move >> 12]
+
+def getPromotionPiece(move):
+    #the piece a promotion move promotes to, or None for other moves
+    if move >> 12 >= PROMOTION:
+        return PROMOTIONPIECES[(move >> 12) - PROMOTION]
+    return None
+
 class Board:
-    def __init__(self, startingFEN, colour='W'):
-        self.fen = startingFEN
-        self.startingPos = fenParse(startingFEN)
-        self.currentPos = fenParse(startingFEN)
-        self.positionLog = [self.fen]
+    def __init__(self, startingFEN, colour=None, useBitboards=True):
+        #the bitboard backend keeps one 64 bit int per piece alongside currentPos.
+        #currentPos is always kept up to date, so the drawing code can keep using it.
+        self.useBitboards = useBitboards
+        self.loadFEN(startingFEN, colour)
+
+    def loadFEN(self, FEN, colour=None):
+        #sets the board up from a FEN, without needing the moves that led to it.
+        #colour overrides the side to move in the FEN if it is given
+        self.currentPos, playerToMove, self.castlingRights, self.enPassantSquare, self.halfmoveClock, self.fullmoveNumber = parseFEN(FEN)
+        self.startingPos = [row[:] for row in self.currentPos]
+        self.playerToMove = colour if colour is not None else playerToMove
         self.moveLog = []
-        self.playerToMove = colour
+        #one undo record per move made, so a move can be taken back without rebuilding the board
+        self.undoStack = []
+        self.loadPieceSquares()
+        if self.useBitboards:
+            self.loadBitboards()
+        #the zobrist key identifies the position, and is updated as moves are made
+        self.zobristKey = self.computeZobristKey()
+        #the material and piece square score, white positive, updated as moves are made like the key
+        self.evalScore = self.computeEvalScore()
+        #the key of every position so far, the last one being the current position
+        self.hashLog = [self.zobristKey]
+
+    def computeZobristKey(self):
+        #builds the key from scratch. after this it is only ever updated
+        key = 0
+        for row in range(0,8):
+            for col in range(0,8):
+                piece = self.currentPos[row][col]
+                if piece != '':
+                    key ^= zobrist.PIECEKEYS[piece][bitboard.squareOf(row, col)]
+        if self.playerToMove == 'b':
+            key ^= zobrist.SIDEKEY
+        key ^= zobrist.CASTLINGKEYS[self.castlingRights]
+        if self.enPassantSquare is not None:
+            key ^= zobrist.ENPASSANTKEYS[self.enPassantSquare & 7]
+        return key
+
+    def computeEvalScore(self):
+        #adds up the score of every piece from scratch
+        score = 0
+        for row in range(0,8):
+            for col in range(0,8):
+                piece = self.currentPos[row][col]
+                if piece != '':
+                    score += const.pieceSquareScores[piece][bitboard.squareOf(row, col)]
+        return score
+
+    def getRepetitionCount(self):
+        #how many times the current position has occurred, including now
+        return self.hashLog.count(self.zobristKey)
+
+    def loadPieceSquares(self):
+        #a set of (row, col) squares for each piece letter, so each piece type can be found without scanning the board
+        self.pieceSquares = {piece: set() for piece in 'PNBRQKpnbrqk'}
+        #the square of each king, or None if that king is not on the board
+        self.kingSquares = {'W': None, 'b': None}
+        for row in range(0,8):
+            for col in range(0,8):
+                piece = self.currentPos[row][col]
+                if piece != '':
+                    self.pieceSquares[piece].add((row, col))
+                    if piece == 'K' or piece == 'k':
+                        self.kingSquares['W' if piece == 'K' else 'b'] = (row, col)
+
+    def loadBitboards(self):
+        #builds the bitboards from scratch using currentPos
+        #keys are the piece letters used in currentPos, so 'P' is white pawns and 'p' is black pawns
+        self.bitboards = {piece: 0 for piece in 'PNBRQKpnbrqk'}
+        #occupancy masks for each colour
+        self.occupancy = {'W': 0, 'b': 0}
+        for row in range(0,8):
+            for col in range(0,8):
+                piece = self.currentPos[row][col]
+                if piece != '':
+                    bit = 1 << bitboard.squareOf(row, col)
+                    self.bitboards[piece] |= bit
+                    self.occupancy['W' if piece.isupper() else 'b'] |= bit
+
+    def setSquare(self, square, piece):
+        #puts a piece (or '' to empty it) on a square, keeping the bitboards in sync with currentPos
+        row, col = bitboard.COORDS[square]
+        oldPiece = self.currentPos[row][col]
+        self.currentPos[row][col] = piece
+        #XORs the old piece out of the key and the new piece in, and does the same for the score
+        if oldPiece != '':
+            self.zobristKey ^= zobrist.PIECEKEYS[oldPiece][square]
+            self.evalScore -= const.pieceSquareScores[oldPiece][square]
+        if piece != '':
+            self.zobristKey ^= zobrist.PIECEKEYS[piece][square]
+            self.evalScore += const.pieceSquareScores[piece][square]
+        #updates the piece squares and the king squares
+        if oldPiece != '':
+            self.pieceSquares[oldPiece].discard((row, col))
+            kingColour = 'W' if oldPiece == 'K' else 'b'
+            #only cleared if the king has not already been put on its new square
+            if (oldPiece == 'K' or oldPiece == 'k') and self.kingSquares[kingColour] == (row, col):
+                self.kingSquares[kingColour] = None
+        if piece != '':
+            self.pieceSquares[piece].add((row, col))
+            if piece == 'K' or piece == 'k':
+                self.kingSquares['W' if piece == 'K' else 'b'] = (row, col)
+        if self.useBitboards:
+            bit = 1 << square
+            if oldPiece != '':
+                self.bitboards[oldPiece] ^= bit
+                self.occupancy['W' if oldPiece.isupper() else 'b'] ^= bit
+            if piece != '':
+                self.bitboards[piece] |= bit
+                self.occupancy['W' if piece.isupper() else 'b'] |= bit
+
+    def getPieceAt(self, square):
+        row, col = bitboard.COORDS[square]
+        return self.currentPos[row][col]
+
+    def getRookSquares(self, kingSquare, flag):
+        #the squares the rook moves between when castling
+        if flag == CASTLINGK:
+            return kingSquare+3, kingSquare+1
+        else:
+            return kingSquare-4, kingSquare-1
     
     def makeFullMove(self, move):
+        fromSquare = move & 63
+        toSquare = (move >> 6) & 63
+        flag = move >> 12
+        movedPiece = self.getPieceAt(fromSquare)
+        #the captured piece is usually on the target square, en passant is the exception
+        capturedPiece = self.getPieceAt(toSquare)
+        capturedSquare = toSquare
+        #the state the move changes is kept in the undo record, so it can be put back
+        castlingBefore = self.castlingRights
+        enPassantBefore = self.enPassantSquare
+        halfmoveBefore = self.halfmoveClock
+
+        ##moves the piece on the starting position to the target square
+        self.setSquare(toSquare, movedPiece)
+        ##empties the square that the piece came from
+        self.setSquare(fromSquare, '')
+
+        if flag == NORMAL:
+            pass
+
+        #en passant moves should delete the pawn from behind the friendly pawn
+        elif flag == ENPASSANT:
+            #the taken pawn is one row behind the target square, which is 8 squares
+            capturedSquare = toSquare + (8 if self.playerToMove == "W" else -8)
+            capturedPiece = self.getPieceAt(capturedSquare)
+            #removes the enemy pawn from the board
+            self.setSquare(capturedSquare, '')
+        
+        #promotion moves replace the pawn with the piece chosen in the move
+        elif flag >= PROMOTION:
+            promotionPiece = PROMOTIONPIECES[flag - PROMOTION]
+            pieceLetter = promotionPiece.upper() if self.playerToMove == "W" else promotionPiece
+            #changes the piece at that position to be the promoted piece.
+            self.setSquare(toSquare, pieceLetter)
+
+        #castling moves should move both the king and the rook
+        else:
+            rookInitial, rookFinal = self.getRookSquares(fromSquare, flag)
+            self.setSquare(rookFinal, self.getPieceAt(rookInitial))
+            self.setSquare(rookInitial, '')
+
+        #the undo record holds everything needed to put the board back as it was
+        self.undoStack.append((move, movedPiece, capturedPiece, capturedSquare, self.playerToMove, castlingBefore, enPassantBefore, halfmoveBefore))
         self.moveLog.append(move)
 
-        def makeBasicMove():
-            start = move.initial
-            target = move.final
-            ##moves the piece on the starting position to the target square
-            self.currentPos[target[0]][target[1]] = self.currentPos[start[0]][start[1]]
-            ##empties the square that the piece came from
-            self.currentPos[start[0]][start[1]] = ''
-
-
-        match move.moveType:
-            #normal moves are just made on the board
-            case "normal":
-                makeBasicMove()
-
-            #en passant moves should delete the pawn from behind the friendly pawn
-            case "en passant":
-
-                #The row relative to the player pawn in which the takenD pawn is
-                if self.playerToMove == "W":
-                    direction = 1
-                else:
-                    direction = -1
-
-                makeBasicMove()
-                targetRow, targetCol = move.final
-                #removes the enemy pawn from the board
-                self.currentPos[targetRow + direction][targetCol] = ''
-            
-            #promotion moves should give the user the option of pieces to promote to
-            case "promotion":
-                queenLetter = "Q" if self.playerToMove == "W" else "q"
-                #makes the move on the board
-                makeBasicMove()
-                targetRow, targetCol = move.final
-                #changes the piece at that position to be a queen.
-                self.currentPos[targetRow][targetCol] = queenLetter
-
-            #castling moves should move both the king and the rook
-            case "castlingK":
-                #get the kings coordinates
-                kingInitial = move.initial
-                #this allows me to find the rook coordinates
-                rookInitial = (kingInitial[0], kingInitial[1]+3)
-                #instantiate the rook move
-                rookMove = Move(rookInitial, (rookInitial[0], rookInitial[1]-2))
-                #make the rook move
-                self.makeFullMove(rookMove)
-                #make the king move
-                makeBasicMove()
-                self.playerToMove = 'W' if self.playerToMove == 'b' else 'b'
-            case "castlingQ":
-                #repeat the above, but with different offsets for the rook
-                kingInitial = move.initial
-                rookInitial = (kingInitial[0], kingInitial[1]-4)
-                rookMove = Move(rookInitial, (rookInitial[0], rookInitial[1]+2))
-                self.makeFullMove(rookMove)
-                makeBasicMove()
-                self.playerToMove = 'W' if self.playerToMove == 'b' else 'b'
-
+        #moving a king or rook, or capturing a rook, loses castling rights
+        self.castlingRights &= CASTLINGMASKS[fromSquare] & CASTLINGMASKS[toSquare]
+        #a pawn moving two squares can be taken en passant on the square it passed over
+        isPawnMove = movedPiece == 'P' or movedPiece == 'p'
+        if isPawnMove and abs(toSquare - fromSquare) == 16:
+            self.enPassantSquare = (fromSquare + toSquare) // 2
+        else:
+            self.enPassantSquare = None
+        #the halfmove clock counts moves since the last capture or pawn move
+        if isPawnMove or capturedPiece != '':
+            self.halfmoveClock = 0
+        else:
+            self.halfmoveClock += 1
+        if self.playerToMove == 'b':
+            self.fullmoveNumber += 1
         self.playerToMove = 'W' if self.playerToMove == 'b' else 'b'
-        self.updateFEN()
-        self.positionLog.append(self.fen)
+
+        #the pieces were XORed by setSquare, so only the side, castling and en passant parts are left
+        self.zobristKey ^= zobrist.SIDEKEY
+        if self.castlingRights != castlingBefore:
+            self.zobristKey ^= zobrist.CASTLINGKEYS[castlingBefore] ^ zobrist.CASTLINGKEYS[self.castlingRights]
+        if enPassantBefore is not None:
+            self.zobristKey ^= zobrist.ENPASSANTKEYS[enPassantBefore & 7]
+        if self.enPassantSquare is not None:
+            self.zobristKey ^= zobrist.ENPASSANTKEYS[self.enPassantSquare & 7]
+        self.hashLog.append(self.zobristKey)
     
     def undoMove(self):
-        if len(self.positionLog) > 1:
-            # Remove the current position from the log
-            self.positionLog.pop()
-            # Restore the previous position
-            self.currentPos = fenParse(self.positionLog[-1])
-            # Switch player after undoing a move
-            self.playerToMove = 'W' if self.playerToMove == 'b' else 'b'
+        #a null move made by the search is taken back the same way, so a stopped search can undo everything
+        if len(self.undoStack) > 0 and self.undoStack[-1][0] is None:
+            self.undoNullMove()
+        elif len(self.undoStack) > 0:
+            move, movedPiece, capturedPiece, capturedSquare, previousPlayer, self.castlingRights, self.enPassantSquare, self.halfmoveClock = self.undoStack.pop()
+            self.moveLog.pop()
+            fromSquare = move & 63
+            toSquare = (move >> 6) & 63
+            flag = move >> 12
+
+            #moves the piece back, which also undoes a promotion
+            self.setSquare(toSquare, '')
+            self.setSquare(fromSquare, movedPiece)
+            #puts back any captured piece
+            if capturedPiece != '':
+                self.setSquare(capturedSquare, capturedPiece)
+
+            #puts the rook back after castling
+            if flag == CASTLINGK or flag == CASTLINGQ:
+                rookInitial, rookFinal = self.getRookSquares(fromSquare, flag)
+                self.setSquare(rookInitial, self.getPieceAt(rookFinal))
+                self.setSquare(rookFinal, '')
+
+            if previousPlayer == 'b':
+                self.fullmoveNumber -= 1
+            self.playerToMove = previousPlayer
+            #the previous key is restored from the history rather than recalculated
+            self.hashLog.pop()
+            self.zobristKey = self.hashLog[-1]
+
+    def makeNullMove(self):
+        #passes the turn without moving a piece. only used by the search, to see whether the position
+        #is so good that the opponent could not catch up even with a free move. it is not put in moveLog
+        self.undoStack.append((None, '', '', None, self.playerToMove, self.castlingRights, self.enPassantSquare, self.halfmoveClock))
+        self.zobristKey ^= zobrist.SIDEKEY
+        if self.enPassantSquare is not None:
+            self.zobristKey ^= zobrist.ENPASSANTKEYS[self.enPassantSquare & 7]
+            self.enPassantSquare = None
+        self.playerToMove = 'W' if self.playerToMove == 'b' else 'b'
+        self.hashLog.append(self.zobristKey)
+
+    def undoNullMove(self):
+        move, movedPiece, capturedPiece, capturedSquare, self.playerToMove, self.castlingRights, self.enPassantSquare, self.halfmoveClock = self.undoStack.pop()
+        self.hashLog.pop()
+        self.zobristKey = self.hashLog[-1]
     
     def isGameOver(self):
         moveGen = MoveGenerator(self)
-        allLegalMoves = moveGen.getLegalMoves()
-        if len(allLegalMoves) == 0:
+        #the game is only over if there is no legal move, so the search stops at the first one
+        if not moveGen.hasAnyLegalMove():
             #it is checkmate if the player is in check
             if moveGen.isInCheck(self, self.playerToMove):
                 return True, self.playerToMove
@@ -117,11 +370,17 @@ class Board:
             else:
                 return True, ''
         return False, ''
+
+    @property
+    def fen(self):
+        #the FEN is only built when it is asked for, not after every move
+        return self.getFEN()
     
-    def updateFEN(self):
-        fen = ''
+    def getFEN(self):
+        rows = []
         #converts the board to FEN notation row by row
         for row in self.currentPos:
+            rowFEN = ''
             emptyCount = 0
             for square in row:
                 if square == '':
@@ -129,23 +388,57 @@ class Board:
                 else:
                     if emptyCount > 0:
                         #if a piece is discovered, a number is added to the FEN, and the empty count is reset.
-                        fen += str(emptyCount)
+                        rowFEN += str(emptyCount)
                         emptyCount = 0
-                    fen += square
+                    rowFEN += square
             #for empty squares at end of rows.
             if emptyCount > 0:
-                fen += str(emptyCount)
-            fen += '/'
-        
-        #removes the '/' at the end of the FEN.
-        fen = fen[:-1]
-        self.fen = fen
-
-class Move:
-    def __init__(self, initial, final, type="normal"):
-        self.initial = initial
-        self.final = final
-        self.moveType = type
+                rowFEN += str(emptyCount)
+            rows.append(rowFEN)
+
+        #the castling letters for each right still held, in the order K, Q, k, q
+        castling = ''.join(letter for letter, bit in CASTLINGLETTERS.items() if self.castlingRights & bit) or '-'
+        if self.enPassantSquare is None:
+            enPassant = '-'
+        else:
+            row, col = bitboard.COORDS[self.enPassantSquare]
+            enPassant = 'abcdefgh'[col] + str(8 - row)
+        side = 'w' if self.playerToMove == 'W' else 'b'
+        return ' '.join(['/'.join(rows), side, castling, enPassant, str(self.halfmoveClock), str(self.fullmoveNumber)])
+
+class Move(int):
+    #builds a packed move from (row, col) squares, for code that works with squares rather than ints.
+    #the generators make plain ints, which are equal to the Move with the same squares and type.
+    __slots__ = ()
+
+    def __new__(cls, initial, final, type="normal", promotionPiece="q"):
+        if type == "promotion":
+            flag = PROMOTION + PROMOTIONPIECES.index(promotionPiece)
+        else:
+            flag = MOVETYPES.index(type)
+        return int.__new__(cls, encodeMove(bitboard.squareOf(initial[0], initial[1]), bitboard.squareOf(final[0], final[1]), flag))
+
+    initial = property(getMoveInitial)
+    final = property(getMoveFinal)
+    moveType = property(getMoveType)
+    promotionPiece = property(getPromotionPiece)
+
+def appendPawnMove(moveList, initial, final, moveType):
+    #a promoting pawn move is added once for each piece it can promote to
+    if moveType == "promotion":
+        for piece in PROMOTIONPIECES:
+            moveList.append(Move(initial, final, moveType, piece))
+    else:
+        moveList.append(Move(initial, final, moveType))
+
+def getMoveName(move):
+    #the move in coordinate notation, e.g. 'e2e4' or 'e7e8q'
+    def squareName(square):
+        return 'abcdefgh'[square[1]] + str(8 - square[0])
+    name = squareName(getMoveInitial(move)) + squareName(getMoveFinal(move))
+    if getPromotionPiece(move) is not None:
+        name += getPromotionPiece(move)
+    return name
     
 def getAllLegalMoves(board):
     moveGen = MoveGenerator(board)
@@ -158,27 +451,20 @@ class MoveGenerator:
         self.currentPos = board.currentPos
         self.player = board.playerToMove
         self.moveLog = board.moveLog
-        self.moves = self.getLegalMoves()
 
     def isInCheck(self, board, colourToPlay):
-        boardPos = board.currentPos
-        def getKingPos(pos, colour):
-            for row in range(0,8):
-                for col in range(0,8):
-                    pieceName = pos[row][col]
-                    #type of piece irrespective of colour
-                    pieceType = pieceName.lower()
-                    #kings represented by letter k
-                    if pieceType == "k":
-                        if (pieceName.isupper() == colour.isupper()):
-                            return (row,col)
-            return 0
-        
-        kingPos = getKingPos(boardPos, colourToPlay)
-        try:
-            kingRow, kingCol = kingPos
-        except:
+        #the king's square is tracked by the board, so it does not need searching for
+        kingPos = board.kingSquares[colourToPlay]
+        if kingPos is None:
             return False
+        kingRow, kingCol = kingPos
+
+        if board.useBitboards:
+            #the attack tables are looked up from the king's square
+            enemyColour = 'b' if colourToPlay == 'W' else 'W'
+            return bitboard.isSquareAttacked(board.bitboards, board.occupancy, bitboard.squareOf(kingRow, kingCol), enemyColour)
+
+        boardPos = board.currentPos
 
         #--------------------------------------------------------------
                 #CHECKING FOR KNIGHT MOVES
@@ -275,6 +561,8 @@ class MoveGenerator:
                         if searchedRow-kingRow == pawnOffset:
                             #then the kings in check
                             return True
+                        #otherwise the pawn blocks the diagonal
+                        break
                     
                     elif offsetSquare != '':
                         break
@@ -286,32 +574,146 @@ class MoveGenerator:
 
         return False
 
+    def generateMoves(self, stage="all"):
+        #yields the legal moves one at a time, so a caller that stops early never generates the rest.
+        #stage is "all", "captures" (captures, en passant and promotions) or "quiet" (everything else)
+        if self.board.useBitboards:
+            return self.generateBitboardLegalMoves(stage)
+        else:
+            return self.generateSquareLegalMoves(stage)
+
+    #move lists are arrays of 16 bit ints, see encodeMove
     def getLegalMoves(self):
+        return array('H', self.generateMoves())
+
+    def getCaptureMoves(self):
+        return array('H', self.generateMoves("captures"))
+
+    def getQuietMoves(self):
+        return array('H', self.generateMoves("quiet"))
+
+    def hasAnyLegalMove(self):
+        #stops at the first legal move found
+        for move in self.generateMoves():
+            return True
+        return False
+
+    def generateSquareLegalMoves(self, stage="all"):
+        board = self.board
+        inCheck = self.isInCheck(board, self.player)
 
         #function to make sure a move is fully legal
         def isLegal(move):
-            tempBoard = Board(self.board.fen)
-            tempBoard.makeFullMove(move)
-            if self.isInCheck(tempBoard, self.player):
-                return False
-            else:
+            flag = move >> 12
+            if flag == CASTLINGK or flag == CASTLINGQ:
+                #the king cannot castle out of check, or through an attacked square
+                if inCheck:
+                    return False
+                kingSquare = move & 63
+                passedSquare = kingSquare+1 if flag == CASTLINGK else kingSquare-1
+                board.makeFullMove(encodeMove(kingSquare, passedSquare))
+                passedSquareAttacked = self.isInCheck(board, self.player)
+                board.undoMove()
+                if passedSquareAttacked:
+                    return False
+
+            #the move is made on the board itself and then taken back, rather than on a copy of the board
+            board.makeFullMove(move)
+            legal = not self.isInCheck(board, self.player)
+            board.undoMove()
+            return legal
+
+        #function to tell if a move belongs to the captures stage
+        def isCapture(move):
+            if move >> 12 == ENPASSANT or move >> 12 >= PROMOTION:
                 return True
+            finalRow, finalCol = getMoveFinal(move)
+            return self.currentPos[finalRow][finalCol] != ''
         
         #gets all pseudo legal moves
         #a pseudo legal move is one where the piece does not move outside of its range
         #pseudo legal moves allow the user to put their own king in check, so this must be filtered
+        #the whole list is made first, as making moves changes the piece squares the generators loop over
         pseudoLegalMoves = self.getPseudoLegalMoves()
-        legalMoves = []
 
         #filters all moves that put ones own king in check
         for move in pseudoLegalMoves:
+            if stage != "all" and isCapture(move) != (stage == "captures"):
+                continue
             if isLegal(move):
-                legalMoves.append(move)
-        
-        return legalMoves
+                yield move
+
+    def generateBitboardLegalMoves(self, stage="all"):
+        #the pieces giving check and the pinned pieces are worked out once for the position.
+        #only king moves, en passant and moves of pinned pieces then need any extra checking.
+        board = self.board
+        bitboards = board.bitboards
+        occupancy = board.occupancy
+        enemyColour = 'b' if self.player == 'W' else 'W'
+
+        kingCoords = board.kingSquares[self.player]
+        if kingCoords is None:
+            #without a king there is nothing to keep out of check
+            yield from self.generateBitboardPseudoLegalMoves(stage)
+            return
+        kingSquare = bitboard.squareOf(kingCoords[0], kingCoords[1])
+        kingBitboard = 1 << kingSquare
+
+        checkers = bitboard.attackersOf(bitboards, occupancy, kingSquare, enemyColour)
+        pins = bitboard.pinnedPieces(bitboards, occupancy, kingSquare, self.player)
+        #sliding pieces see through the king, so it cannot step backwards along the line of a check
+        occupancyWithoutKing = (occupancy['W'] | occupancy['b']) ^ kingBitboard
+
+        #the squares a non king move has to land on
+        if checkers == 0:
+            checkMask = bitboard.FULL
+        elif checkers & (checkers - 1) == 0:
+            #in check from one piece, the move has to capture it or block the check
+            checkMask = checkers | bitboard.BETWEEN[kingSquare][bitboard.lowestSquare(checkers)]
+        else:
+            #in double check only the king can move
+            checkMask = 0
+
+        for move in self.generateBitboardPseudoLegalMoves(stage):
+            fromSquare = move & 63
+            toSquare = (move >> 6) & 63
+            flag = move >> 12
+
+            if fromSquare == kingSquare:
+                if flag == CASTLINGK or flag == CASTLINGQ:
+                    #the king cannot castle out of check, or through or into an attacked square
+                    if checkers:
+                        continue
+                    step = 1 if flag == CASTLINGK else -1
+                    if bitboard.isSquareAttacked(bitboards, occupancy, kingSquare + step, enemyColour):
+                        continue
+                    if bitboard.isSquareAttacked(bitboards, occupancy, kingSquare + 2*step, enemyColour):
+                        continue
+                elif bitboard.isSquareAttacked(bitboards, occupancy, toSquare, enemyColour, occupancyWithoutKing):
+                    continue
+
+            elif flag == ENPASSANT:
+                #en passant removes two pieces from the same row, which can uncover a check that
+                #the pin detection does not see, so the move is made and tested
+                board.makeFullMove(move)
+                legal = not self.isInCheck(board, self.player)
+                board.undoMove()
+                if not legal:
+                    continue
+
+            else:
+                if not (1 << toSquare) & checkMask:
+                    continue
+                #a pinned piece can only move along the line between the king and the pinning piece
+                if fromSquare in pins and not (1 << toSquare) & pins[fromSquare]:
+                    continue
+
+            yield move
     
 
     def getPseudoLegalMoves(self):
+        if self.board.useBitboards:
+            return list(self.generateBitboardPseudoLegalMoves())
 
         def getPawnMoves():
 
@@ -321,13 +723,11 @@ class MoveGenerator:
                 direction = -1
                 enPassantRow = 3
                 startingSquare = 6
-                enemyPawn = "p"
             else:
                 #positive direction if black
                 direction = 1
                 enPassantRow = 4
                 startingSquare = 1
-                enemyPawn = "P"
 
 
             #list of all pawn moves to be appended to
@@ -336,73 +736,62 @@ class MoveGenerator:
             #this will make the code easier to write and read
             pos = self.currentPos
 
-            #iterate through the board to look for pawns
-            for row in range(0,8):
-                for col in range(0,8):
-                    piece = pos[row][col]
-                    #the piece is a pawn
-                    if piece.upper() == "P":
-                        #if the piece is the same colour as the player
-                        if (piece.isupper() == self.player.isupper()):
+            #only the squares holding the player's pawns are visited
+            for row, col in self.board.pieceSquares["P" if self.player == "W" else "p"]:
+                
+                newRow = row + direction
+                #handles promotion for all other moves.
+                if newRow in [0,7]:
+                    moveType = "promotion"
+                else:
+                    moveType = "normal"
+
+            #--------------------------------------------------------
+                #FORWARD MOVES
+
+                if newRow in range(0,8):
+                    #single moves
+                    if pos[newRow][col] == '':
+                        appendPawnMove(pawnMoves, (row, col), (row + direction, col), moveType)
+                        #double move from starting position
+                        doubleRow = row + (2*direction)
+                        if doubleRow in range(0,8):
+                            #handles promotion for double moves
+                            if row == startingSquare and pos[doubleRow][col] == '':
+                                #appends the move to the move list
+                                appendPawnMove(pawnMoves, (row, col), (doubleRow, col), moveType)
+
+            #--------------------------------------------------------
+            #--------------------------------------------------------
+                #DIAGONAL MOVES
                             
-                            newRow = row + direction
-                            #handles promotion for all other moves.
-                            if newRow in [0,7]:
-                                moveType = "promotion"
-                            else:
-                                moveType = "normal"
-
-                #--------------------------------------------------------
-                            #FORWARD MOVES
-
-                            if newRow in range(0,8):
-                                #single moves
-                                if pos[newRow][col] == '':
-                                    pawnMoves.append(Move((row, col), (row + direction, col), moveType))
-                                    #double move from starting position
-                                    doubleRow = row + (2*direction)
-                                    if doubleRow in range(0,8):
-                                        #handles promotion for double moves
-                                        if row == startingSquare and pos[doubleRow][col] == '':
-                                            #appends the move to the move list
-                                            pawnMoves.append(Move((row, col), (doubleRow, col), moveType))
-
-                #--------------------------------------------------------
-                #--------------------------------------------------------
-                            #DIAGONAL MOVES
-                                        
-                            #makes sure the pawn can't go off the board
-                            if newRow in range(0,8):
-                                #checks diagonally right
-                                if col != 7:
-                                    diagonalSquare = pos[row + direction][col + 1]
-                                    #if the square on the diagonal is not empty, and is of a different colour to the player
-                                    if (diagonalSquare != '') and not (diagonalSquare.isupper() == self.player.isupper()):
-                                        pawnMoves.append(Move((row, col), (row + direction, col + 1), moveType))
-                                #checks diagonally left
-                                if col != 0:
-                                    diagonalSquare = pos[row + direction][col - 1]
-                                    #if the square on the diagonal is not empty, and is of a different colour to the player
-                                    if (diagonalSquare != '') and not (diagonalSquare.isupper() == self.player.isupper()):
-                                        pawnMoves.append(Move((row, col), (row + direction, col - 1), moveType))
-                #--------------------------------------------------------
-                #--------------------------------------------------------
-                            #EN PASSANT MOVES
-                                        
-                            if row == enPassantRow:
-                                #gets the previous move
-                                if len(self.moveLog) >= 1:
-                                    previousMove = self.moveLog[-1]
-                                    previousTargetCol = previousMove.final[1]
-                                    if abs(previousTargetCol - col) == 1:
-                                        #if the piece moved 2 squares
-                                        if abs(previousMove.final[0] - previousMove.initial[0]) == 2:
-                                            #and the piece is a pawn
-                                            if pos[previousMove.final[0]][previousTargetCol] == enemyPawn:
-                                                #appends an en passant move
-                                                pawnMoves.append(Move((row, col), (newRow, previousTargetCol), "en passant"))
-                #--------------------------------------------------------          
-            
+                #makes sure the pawn can't go off the board
+                if newRow in range(0,8):
+                    #checks diagonally right
+                    if col != 7:
+                        diagonalSquare = pos[row + direction][col + 1]
+                        #if the square on the diagonal is not empty, and is of a different colour to the player
+                        if (diagonalSquare != '') and not (diagonalSquare.isupper() == self.player.isupper()):
+                            appendPawnMove(pawnMoves, (row, col), (row + direction, col + 1), moveType)
+                    #checks diagonally left
+                    if col != 0:
+                        diagonalSquare = pos[row + direction][col - 1]
+                        #if the square on the diagonal is not empty, and is of a different colour to the player
+                        if (diagonalSquare != '') and not (diagonalSquare.isupper() == self.player.isupper()):
+                            appendPawnMove(pawnMoves, (row, col), (row + direction, col - 1), moveType)
+            #--------------------------------------------------------
+            #--------------------------------------------------------
+                #EN PASSANT MOVES
+                            
+                if row == enPassantRow:
+                    #the board keeps the square an enemy pawn has just passed over
+                    if self.board.enPassantSquare is not None:
+                        enPassantCol = self.board.enPassantSquare & 7
+                        if abs(enPassantCol - col) == 1:
+                            #appends an en passant move
+                            pawnMoves.append(Move((row, col), (newRow, enPassantCol), "en passant"))
+            #--------------------------------------------------------
+
             return pawnMoves
                         
             
@@ -428,63 +817,57 @@ class MoveGenerator:
                 'q' : [(1,0),(0,1),(-1,0),(0,-1),
                       (1,1),(-1,1),(1,-1),(-1,-1)]
             }
-            #iterate through the board
-            for row in range(0,8):
-                for col in range(0,8):
-                    #if the piece in the position is a sliding piece
-                    pieceName = pos[row][col]
-                    #type of piece irrespective of colour
-                    pieceType = pieceName.lower()
-                    if pieceType in slidingPieces:
-                        #and is of the same colour as the player
-                        if (pieceName.isupper() == self.player.isupper()):
-                            ##GENERATE MOVES
-
-                            #gets all of the increment directions for a piece
-                            pieceIncrements = pieceOffsets[pieceType]
-                            #iterates through these offsets
-                            for incr in pieceIncrements:
-                                #splits an increment into its row and column increment
-                                rowIncr = incr[0]
-                                colIncr = incr[1]
-
-                                #defines a possible move row and column
-                                possibleMoveRow = row + rowIncr
-                                possibleMoveCol = col + colIncr
-
-                                #boolean describes if the square is on the board
-                                pieceOnBoard = True
-                                while pieceOnBoard:
-                                    #if else validates that the piece is on the board, before making a move
-                                    if possibleMoveRow in range(0,8) and possibleMoveCol in range(0,8):
-                                        #gets the initial and final square for a possible move
-                                        initialSquare = (row, col)
-                                        finalSquare = (possibleMoveRow, possibleMoveCol)
-
-                                        #the move type for a sliding move is always normal.
-                                        #castling will be done using the king
-                                        possibleMove = Move(initialSquare, finalSquare, "normal")
-                                        targetSquare = pos[possibleMoveRow][possibleMoveCol]
-
-                                        #if a square is empty, a move is made and the loop continues
-                                        if targetSquare == '':
-                                            slidingMoves.append(possibleMove)
-
-                                        #if a square has an enemy piece, the move is made and the loop is broken
-                                        elif (targetSquare.isupper() != self.player.isupper()):
-                                            slidingMoves.append(possibleMove)
-                                            break
-
-                                        #if a square has a friendly piece, the move is not made, and the loop is broken
-                                        elif (targetSquare.isupper() == self.player.isupper()):
-                                            break
-
-                                        possibleMoveRow += rowIncr
-                                        possibleMoveCol += colIncr
-
-
-                                    else:
-                                        pieceOnBoard = False
+            #only the squares holding the player's sliding pieces are visited
+            for pieceType in slidingPieces:
+                pieceName = pieceType.upper() if self.player == "W" else pieceType
+                for row, col in self.board.pieceSquares[pieceName]:
+                    ##GENERATE MOVES
+
+                    #gets all of the increment directions for a piece
+                    pieceIncrements = pieceOffsets[pieceType]
+                    #iterates through these offsets
+                    for incr in pieceIncrements:
+                        #splits an increment into its row and column increment
+                        rowIncr = incr[0]
+                        colIncr = incr[1]
+
+                        #defines a possible move row and column
+                        possibleMoveRow = row + rowIncr
+                        possibleMoveCol = col + colIncr
+
+                        #boolean describes if the square is on the board
+                        pieceOnBoard = True
+                        while pieceOnBoard:
+                            #if else validates that the piece is on the board, before making a move
+                            if possibleMoveRow in range(0,8) and possibleMoveCol in range(0,8):
+                                #gets the initial and final square for a possible move
+                                initialSquare = (row, col)
+                                finalSquare = (possibleMoveRow, possibleMoveCol)
+
+                                #the move type for a sliding move is always normal.
+                                #castling will be done using the king
+                                possibleMove = Move(initialSquare, finalSquare, "normal")
+                                targetSquare = pos[possibleMoveRow][possibleMoveCol]
+
+                                #if a square is empty, a move is made and the loop continues
+                                if targetSquare == '':
+                                    slidingMoves.append(possibleMove)
+
+                                #if a square has an enemy piece, the move is made and the loop is broken
+                                elif (targetSquare.isupper() != self.player.isupper()):
+                                    slidingMoves.append(possibleMove)
+                                    break
+
+                                #if a square has a friendly piece, the move is not made, and the loop is broken
+                                elif (targetSquare.isupper() == self.player.isupper()):
+                                    break
+
+                                possibleMoveRow += rowIncr
+                                possibleMoveCol += colIncr
+
+
+                            else:
+                                pieceOnBoard = False
 
             return slidingMoves
 
@@ -502,32 +885,24 @@ class MoveGenerator:
                 (-1, 2), (-1, -2)
             ]
 
-            #iterate through the board
-            for row in range(0,8):
-                for col in range(0,8):
-                    pieceName = pos[row][col]
-                    #type of piece irrespective of colour
-                    pieceType = pieceName.lower()
-                    #knights represented by letter n
-                    if pieceType == "n":
-                        #if the knight is the same colour as the player
-                        if (pieceName.isupper() == self.player.isupper()):
-                            #loop through 8 squares
-                            for offset in offsets:
-                                #define potential coordinates
-                                potentialMoveRow = row + offset[0]
-                                potentialMoveCol = col + offset[1]
-
-                                initial = (row, col)
-                                target = (potentialMoveRow, potentialMoveCol)
-                                #validation for move
-                                if potentialMoveRow in range(0,8) and potentialMoveCol in range(0,8):
-                                    targetPiece = pos[potentialMoveRow][potentialMoveCol]
-                                    if (targetPiece.isupper() != self.player.isupper()) or targetPiece == '':
-                                        #add the move
-                                        move = Move(initial, target, "normal")
-                                        knightMoves.append(move)
-            
+            #only the squares holding the player's knights are visited
+            for row, col in self.board.pieceSquares["N" if self.player == "W" else "n"]:
+                #loop through 8 squares
+                for offset in offsets:
+                    #define potential coordinates
+                    potentialMoveRow = row + offset[0]
+                    potentialMoveCol = col + offset[1]
+
+                    initial = (row, col)
+                    target = (potentialMoveRow, potentialMoveCol)
+                    #validation for move
+                    if potentialMoveRow in range(0,8) and potentialMoveCol in range(0,8):
+                        targetPiece = pos[potentialMoveRow][potentialMoveCol]
+                        if (targetPiece.isupper() != self.player.isupper()) or targetPiece == '':
+                            #add the move
+                            move = Move(initial, target, "normal")
+                            knightMoves.append(move)
+
             return knightMoves
 
         def getKingMoves():
@@ -553,14 +928,14 @@ class MoveGenerator:
                     kingRookCoords = (0,7)
                     queenRookCoords = (0,0)
 
-                #determine if castling is legal
-                if pos[kingCoords[0]][kingCoords[1]] == "K":
-                        #king side
-                        if pos[kingRookCoords[0]][kingRookCoords[1]] == "R":
-                            kingSideCastle = True
-                        #queen side
-                        if pos[queenRookCoords[0]][queenRookCoords[1]] == "R":
-                            queenSideCastle = True
+                #the board keeps which castling rights are left
+                rights = self.board.castlingRights
+                #king side
+                if rights & (1 if isWhite else 4):
+                    kingSideCastle = True
+                #queen side
+                if rights & (2 if isWhite else 8):
+                    queenSideCastle = True
 
                 if kingSideCastle:
                     #searches the squares between the king and rook
@@ -584,7 +959,7 @@ class MoveGenerator:
                     
                     if queenSideCastle:
                         #defines the move as a queen side castle
-                        move = Move(kingCoords, (queenRookCoords[0],queenRookCoords[1]+1), "castlingQ")
+                        move = Move(kingCoords, (queenRookCoords[0],queenRookCoords[1]+2), "castlingQ")
                         #appends the move
                         castleMoves.append(move)
                 
@@ -604,39 +979,142 @@ class MoveGenerator:
                 (-1,-1),  ( 0,-1)
             ]
 
-            #iterate through the board
-            for row in range(0,8):
-                for col in range(0,8):
-                    pieceName = pos[row][col]
-                    #type of piece irrespective of colour
-                    pieceType = pieceName.lower()
-                    #kings represented by letter k
-                    if pieceType == "k":
-                        #if the kings is the same colour as the player
-                        if (pieceName.isupper() == self.player.isupper()):
-                            #loop through 8 squares
-                            for offset in offsets:
-                                #define potential coordinates
-                                potentialMoveRow = row + offset[0]
-                                potentialMoveCol = col + offset[1]
-
-                                initial = (row, col)
-                                target = (potentialMoveRow, potentialMoveCol)
-                                #validation for move
-                                if potentialMoveRow in range(0,8) and potentialMoveCol in range(0,8):
-                                    targetPiece = pos[potentialMoveRow][potentialMoveCol]
-                                    if (targetPiece.isupper() != self.player.isupper()) or targetPiece == '':
-                                        #add the move
-                                        move = Move(initial, target, "normal")
-                                        kingMoves.append(move)
-            
+            #the king's square is tracked by the board, so it does not need searching for
+            kingSquare = self.board.kingSquares[self.player]
+            if kingSquare is not None:
+                row, col = kingSquare
+                #loop through 8 squares
+                for offset in offsets:
+                    #define potential coordinates
+                    potentialMoveRow = row + offset[0]
+                    potentialMoveCol = col + offset[1]
+
+                    initial = (row, col)
+                    target = (potentialMoveRow, potentialMoveCol)
+                    #validation for move
+                    if potentialMoveRow in range(0,8) and potentialMoveCol in range(0,8):
+                        targetPiece = pos[potentialMoveRow][potentialMoveCol]
+                        if (targetPiece.isupper() != self.player.isupper()) or targetPiece == '':
+                            #add the move
+                            move = Move(initial, target, "normal")
+                            kingMoves.append(move)
+
             return kingMoves + getCastleMoves(pos)
         
         pseudoLegalMoves = getPawnMoves() + getSlidingMoves() + getKnightMoves() + getKingMoves()
         return pseudoLegalMoves
-        
 
+    def generateBitboardPseudoLegalMoves(self, stage="all"):
+        #yields the same moves as getPseudoLegalMoves, but using the bitboards
+        #so that only squares holding the player's pieces are ever visited.
+        #the stage picks which moves are generated, see generateMoves
+        bitboards = self.board.bitboards
+        isWhite = self.player == "W"
+        friendly = self.board.occupancy['W' if isWhite else 'b']
+        enemy = self.board.occupancy['b' if isWhite else 'W']
+        allPieces = friendly | enemy
+        empty = ~allPieces & bitboard.FULL
+
+        #the squares pieces other than pawns may move to in this stage
+        if stage == "captures":
+            targetMask = enemy
+        elif stage == "quiet":
+            targetMask = empty
+        else:
+            targetMask = empty | enemy
+
+        def movesTo(fromSquare, targets):
+            #yields a normal move from fromSquare to every square set in targets
+            while targets:
+                lsb = targets & -targets
+                yield fromSquare | ((lsb.bit_length() - 1) << 6)
+                targets ^= lsb
+
+        def appendPawnMoves(pawnMoves, fromSquare, toSquare, isPromotion):
+            #a promoting pawn move is added once for each piece it can promote to
+            move = fromSquare | (toSquare << 6)
+            if isPromotion:
+                for flag in range(PROMOTION, PROMOTION + len(PROMOTIONPIECES)):
+                    pawnMoves.append(move | (flag << 12))
+            else:
+                pawnMoves.append(move)
+
+        def getPawnMoves():
+            pawnMoves = []
+            pawns = bitboards["P" if isWhite else "p"]
+            #white pawns move towards row 0, which is a shift of -8 squares
+            shift = -8 if isWhite else 8
+            #the row a pawn can make a double move from, and the row a pawn promotes on
+            startingRow = bitboard.ROWS[6 if isWhite else 1]
+            promotionRow = bitboard.ROWS[0 if isWhite else 7]
+
+            for fromSquare in bitboard.squares(pawns):
+                fromBit = 1 << fromSquare
+                toSquare = fromSquare + shift
+                isPromotion = bool((1 << toSquare) & promotionRow)
+
+                #FORWARD MOVES
+                #promotions count as captures, as they change the material on the board
+                if (1 << toSquare) & empty and (stage == "all" or (stage == "captures") == isPromotion):
+                    appendPawnMoves(pawnMoves, fromSquare, toSquare, isPromotion)
+                    #double move from the starting row
+                    if fromBit & startingRow and (1 << (toSquare + shift)) & empty and stage != "captures":
+                        appendPawnMoves(pawnMoves, fromSquare, toSquare + shift, isPromotion)
+
+                #DIAGONAL MOVES
+                if stage != "quiet":
+                    captures = bitboard.PAWNATTACKS[self.player][fromSquare] & enemy
+                    for toSquare in bitboard.squares(captures):
+                        appendPawnMoves(pawnMoves, fromSquare, toSquare, isPromotion)
+
+            #EN PASSANT MOVES
+            #the board keeps the square an enemy pawn has just passed over
+            passedSquare = self.board.enPassantSquare
+            if passedSquare is not None and stage != "quiet":
+                #friendly pawns that could capture on the passed square
+                enemyColour = "b" if isWhite else "W"
+                capturingPawns = bitboard.PAWNATTACKS[enemyColour][passedSquare] & pawns
+                for fromSquare in bitboard.squares(capturingPawns):
+                    pawnMoves.append(encodeMove(fromSquare, passedSquare, ENPASSANT))
+
+            return pawnMoves
 
+        def getSlidingMoves():
+            #the attack function for each sliding piece
+            pieceAttacks = {
+                "b": bitboard.bishopAttacks,
+                "r": bitboard.rookAttacks,
+                "q": bitboard.queenAttacks
+            }
+            for pieceType, attacks in pieceAttacks.items():
+                pieceName = pieceType.upper() if isWhite else pieceType
+                for fromSquare in bitboard.squares(bitboards[pieceName]):
+                    yield from movesTo(fromSquare, attacks(fromSquare, allPieces) & targetMask)
 
+        def getKnightMoves():
+            for fromSquare in bitboard.squares(bitboards["N" if isWhite else "n"]):
+                yield from movesTo(fromSquare, bitboard.KNIGHTATTACKS[fromSquare] & targetMask)
 
-        
+        def getKingMoves():
+            kingLetter = "K" if isWhite else "k"
+            for fromSquare in bitboard.squares(bitboards[kingLetter]):
+                yield from movesTo(fromSquare, bitboard.KINGATTACKS[fromSquare] & targetMask)
+
+            #CASTLING MOVES
+            #castling needs the castling right, which the board only keeps while the king and rook
+            #have not moved, and nothing in between them
+            kingSquare = bitboard.squareOf(7 if isWhite else 0, 4)
+            rights = self.board.castlingRights
+            if stage != "captures" and rights:
+                #king side: f and g files empty
+                if rights & (1 if isWhite else 4) and not allPieces & ((1 << (kingSquare + 1)) | (1 << (kingSquare + 2))):
+                    yield encodeMove(kingSquare, kingSquare + 2, CASTLINGK)
+                #queen side: b, c and d files empty
+                if rights & (2 if isWhite else 8) and not allPieces & ((1 << (kingSquare - 1)) | (1 << (kingSquare - 2)) | (1 << (kingSquare - 3))):
+                    yield encodeMove(kingSquare, kingSquare - 2, CASTLINGQ)
+
+        #each piece type is only generated once the moves before it have been used
+        yield from getPawnMoves()
+        yield from getSlidingMoves()
+        yield from getKnightMoves()
+        yield from getKingMoves()
@@ -79,5 +79,22 @@ positionPieceValues = {
     "K": KINGSCORES
 }
 
+#THE OBJECTIVE VALUE OF EACH PIECE, IRRESPECTIVE OF POSITION
 
+objectivePieceValues = {
+    "K": 20000,
+    "Q": 900,
+    "R": 500,
+    "B": 330,
+    "N": 320,
+    "P": 100
+}
+
+#THE SCORE OF EVERY PIECE ON EVERY SQUARE, ITS OBJECTIVE VALUE PLUS ITS POSITION BONUS
+#indexed by piece letter, then by square = row*8 + col. white pieces score positive and black pieces negative.
+#the tables are flipped for black here once, rather than every time a black piece is evaluated.
 
+pieceSquareScores = {}
+for pieceType, scores in positionPieceValues.items():
+    pieceSquareScores[pieceType] = [objectivePieceValues[pieceType] + scores[row][col] for row in range(8) for col in range(8)]
+    pieceSquareScores[pieceType.lower()] = [-(objectivePieceValues[pieceType] + scores[7-row][col]) for row in range(8) for col in range(8)]
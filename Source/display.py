@@ -0,0 +1,14 @@
+#DISPLAY
+#pygame is initialised once, and every screen draws on the same display surface. the window is only
+#set up again when a screen needs a different size, so moving between the menu and a game is quick
+import pygame
+
+def getScreen(size, caption):
+    #returns the display surface at the given size, initialising pygame the first time
+    if not pygame.get_init():
+        pygame.init()
+    screen = pygame.display.get_surface()
+    if screen is None or screen.get_size() != size:
+        screen = pygame.display.set_mode(size)
+    pygame.display.set_caption(caption)
+    return screen
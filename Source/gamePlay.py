@@ -1,45 +1,71 @@
 import pygame
-import os
 import sys
 import Source.chessLogic as chessLogic
 import Source.chessEngine as chessEngine
-from copy import deepcopy
+import Source.transposition as transposition
+import Source.display as display
+import Source.assets as assets
+
+#whether the AI keeps searching on the human's time, on the reply it expects. off by default, as it keeps a core busy while the human thinks
+PONDER = False
+#the most frames drawn each second. the loop sleeps for the rest of each frame, so it uses almost no CPU between moves
+FRAMERATE = 30
 
 class Gameplay:
-    def __init__(self, opponent, fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', colour = 'W'):
-        #initialises the Board. using a new chessLogic.Board class.
+    def __init__(self, opponent, fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', colour = None):
+        #the side to move comes from the FEN, unless a colour is given
         self.fen = fen
         self.colour = colour
-        self.gameBoard = chessLogic.Board(fen, colour)
         self.boardTheme = Themes()
-        self.gameOver = False
-        self.winner = ''
-        #initialises pygame
-        pygame.init()
-        #draws the screen, and gets the background
-        self.screen = pygame.display.set_mode((1200, 800))
-        self.background = pygame.image.load(os.path.join("Assets/PBackground.png"))
-
-        #load controls asset from file.
-        self.controls = pygame.image.load(os.path.join("Assets/Controls.png"))
+        #gets the screen, which is shared with the menu, and the background
         enemyString = 'AI' if opponent == 'AI' else 'Self'
-        pygame.display.set_caption(("Play vs " + enemyString))
+        self.screen = display.getScreen((1200, 800), "Play vs " + enemyString)
+        self.background = assets.getImage("PBackground.png")
+
+        #get controls asset, which is only loaded from file once
+        self.controls = assets.getImage("Controls.png")
 
         #black will be the AI if 'AI' button pressed
         self.blackPlayer = opponent
+        #the AI's transposition table is kept for the whole game, so results carry over between moves.
+        #it is also kept when the game is reset, as its entries are still right for the same positions
+        self.transpositionTable = transposition.TranspositionTable(chessEngine.HASHSIZEMB)
+        #the AI searches on a background thread. this is the search in progress, or None
+        self.aiSearch = None
+        self.ponder = PONDER
 
         self.hoverX,self.hoverY = 0,0
+        self.reset()
+
+    def reset(self):
+        #sets the game back to its starting position. the screen and assets are kept, so this is quick
+        #initialises the Board. using a new chessLogic.Board class.
+        self.gameBoard = chessLogic.Board(self.fen, self.colour)
+        self.gameOver = False
+        self.winner = ''
 
         self.clickedSquares = []
 
+        #the legal moves and game over result for the position with key cachedKey.
+        #playMove runs every frame, so these are only worked out again once a move is made or undone
+        self.cachedKey = None
+        self.cachedLegalMoves = None
+        self.cachedGameOver = None
+
     def mainloop(self):
             ##indefinite game loop, will be broken out of by returning a value
             eventX, eventY = 0,0
+            clock = pygame.time.Clock()
+            #the position and result last drawn. the screen is only drawn again after an event or when these change
+            drawnState = None
             while True:
-                for event in pygame.event.get():
+                events = pygame.event.get()
+                for event in events:
                     ##if the "X" in the top right is pressed
                     match event.type:
                         case pygame.QUIT:
+                            #stops any search still running
+                            self.cancelAISearch()
                             ##quit pygame
                             pygame.quit()
                             ##and then close the program
@@ -50,11 +76,12 @@ class Gameplay:
                             ##this effectively exits the mainloop, and will return to the main menu.
                             match event.key:
                                 case pygame.K_ESCAPE:
+                                    self.cancelAISearch()
                                     return 0
                                 case pygame.K_r:
-                                    #reinitialise the game, resetting all its attributes and methods.
-                                    #this will reset the position of the board aswell.
-                                    self.__init__(self.blackPlayer, self.fen, self.colour)
+                                    #resets the game, putting the board back to its starting position
+                                    self.cancelAISearch()
+                                    self.reset()
                                 case pygame.K_t:
                                     ##system for switching the colour scheme
                                     if not self.gameOver:
@@ -87,30 +114,63 @@ class Gameplay:
                                 case 3:
                                     self.clickedSquares = []
 
-                ##draw all elements to the screen
-                self.draw()  
+                ##draw all elements to the screen, if anything on it could have changed
+                state = (self.gameBoard.zobristKey, self.gameOver)
+                if events or state != drawnState:
+                    self.draw()
+                    drawnState = state
                 self.playMove()
+                clock.tick(FRAMERATE)
 
     def aiMoveGetter(self, allLegalMoves):
-        aiBoard = deepcopy(self.gameBoard)
-        chessAI = chessEngine.ChessAI(aiBoard, self.gameBoard.playerToMove)
-        move = chessAI.getBestMove(aiBoard, allLegalMoves)
-        if move == None:
-            pass
-        #AI move is played on the board
-        else:
-            self.gameBoard.makeFullMove(move)
-            
+        #the search runs in the background, so each frame this either starts it, checks on it,
+        #or plays its move once it has finished
+        #there is nothing to search for once the game is over
+        if len(allLegalMoves) == 0:
+            return
+        if self.aiSearch is not None and self.aiSearch.key != self.gameBoard.zobristKey:
+            #the search is pondering on a move the human did not play, so it is of no use
+            self.cancelAISearch()
+
+        if self.aiSearch is None:
+            self.aiSearch = chessEngine.BackgroundSearch(self.gameBoard, self.transpositionTable)
+        elif self.aiSearch.pondering:
+            #the human played the move the AI expected, so the ponder search carries on as the real search
+            self.aiSearch.ponderHit()
+        elif self.aiSearch.isFinished():
+            move = self.aiSearch.bestMove
+            expectedReply = self.aiSearch.getExpectedReply()
+            self.aiSearch = None
+            #AI move is played on the board
+            if move is not None:
+                self.gameBoard.makeFullMove(move)
+                #the AI thinks on the human's time, assuming they play the reply it expects
+                if self.ponder and expectedReply is not None and expectedReply in chessLogic.getAllLegalMoves(self.gameBoard):
+                    self.aiSearch = chessEngine.BackgroundSearch(self.gameBoard, self.transpositionTable, ponderMove=expectedReply)
+
         #clicked squares is emtied, as it is not the players turn.
         self.clickedSquares = []
+
+    def cancelAISearch(self):
+        if self.aiSearch is not None:
+            self.aiSearch.cancel()
+            self.aiSearch = None
     
+    def updatePositionCache(self):
+        #the zobrist key changes whenever a move is made or undone, so a different key means a different position
+        if self.cachedKey != self.gameBoard.zobristKey:
+            self.cachedKey = self.gameBoard.zobristKey
+            self.cachedGameOver = self.gameBoard.isGameOver()
+            #generates all legal moves for the position
+            self.cachedLegalMoves = chessLogic.getAllLegalMoves(self.gameBoard)
+
     def playMove(self):
-        gameOver = self.gameBoard.isGameOver()
+        self.updatePositionCache()
+        gameOver = self.cachedGameOver
         if gameOver[0]:
             self.gameOver = True
             self.winner = '' if gameOver[1] == '' else 'W' if gameOver[1] == 'b' else 'b'
-        #generates all legal moves for the position
-        allLegalMoves = chessLogic.getAllLegalMoves(self.gameBoard)
+        allLegalMoves = self.cachedLegalMoves
         #if the player is going against the AI, and it's the AIs turn
         if self.blackPlayer == 'AI' and self.gameBoard.playerToMove == 'b':
             self.aiMoveGetter(allLegalMoves)
@@ -123,17 +183,20 @@ class Gameplay:
                 move = chessLogic.Move(self.clickedSquares[0], self.clickedSquares[1])
                 #for loop checks if the move is in the legal moves
                 for m in allLegalMoves:
-                    if m.initial == move.initial and m.final == move.final:
+                    #moves from the generator are packed ints, so the squares are decoded to compare them
+                    if chessLogic.getMoveInitial(m) == move.initial and chessLogic.getMoveFinal(m) == move.final:
                         #makes the move on the board
+                        #promotions are generated queen first, so the first match promotes to a queen
                         self.gameBoard.makeFullMove(m)
+                        break
                 #empties clickedSquares
                 self.clickedSquares = []
 
 
 
     def gameEnd(self, winner):
-        #gets the winner screen from file
-        winnerScreen = pygame.image.load(os.path.join(f'Assets/{winner}win.png'))
+        #gets the winner screen, which is only loaded from file the first time
+        winnerScreen = assets.getImage(f'{winner}win.png')
         #draws to centre of screen
         self.screen.blit(winnerScreen, (423,310))
         #tells the main loop that the game is over
@@ -186,24 +249,13 @@ class Gameplay:
         squareSize = 90
         centreValue = (squareSize-80)//2
 
-        def getFileName(pieceName):
-            ##if pieceName.isupper(), then the piece is white
-            if pieceName.isupper():
-                return 'w' + pieceName.lower()
-            ##else the piece is black and the file name is kept the same
-            else:
-                return pieceName
-
         ##iterate through all squares on the board.
         for r in range(8):
             for c in range(8):
                 ##gets the piece's name, by indexing the currentPos attribute
                 if self.gameBoard.currentPos[r][c] != '':
-                    pieceName = getFileName(self.gameBoard.currentPos[r][c])
-                    ##turns this into a file name using an f-string
-                    pieceFileName = f'{pieceName}.png'
-                    ##load the image from file and then draw it onto the square
-                    piece = pygame.image.load(os.path.join(f'Assets/{pieceFileName}'))
+                    ##the piece images are loaded once and shared, so nothing is read from file here
+                    piece = assets.getPieceImage(self.gameBoard.currentPos[r][c])
                     self.screen.blit(piece, (topLeft[0]+(squareSize*c)+centreValue,topLeft[1]+(squareSize*r)+centreValue))
 
     def drawHover(self):
@@ -243,7 +295,7 @@ class Themes:
         self.colourIndex += 1
         self.currentColour = self.colours[self.colourIndex % 3]
 
-def main(enemy, fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR', colour = 'W'):
+def main(enemy, fen = 'rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1', colour = None):
     game = Gameplay(enemy, fen, colour)
     game.mainloop()
     return 0
@@ -1,19 +1,25 @@
 import pygame
 import sys
-import os
 from Source.const import *
 from Source.button import *
-import Source.gamePlay as gamePlay
-import Source.analysis as analysis
+import Source.display as display
+import Source.assets as assets
+import Source.startupTiming as startupTiming
+#gamePlay and analysis are only imported when their button is pressed, as they bring in the engine,
+#tkinter and python-chess, which would slow down opening the menu
 
 class Main:
     def __init__(self):
-        ##initialise pygame
-        pygame.init()
-        self.screen = pygame.display.set_mode((WIDTH, HEIGHT))
-        pygame.display.set_caption("Main Menu!")
-        ##load background image
-        self.background = pygame.image.load(os.path.join('Assets/Background.png')) 
+        self.setupScreen()
+        startupTiming.mark("initialise display")
+        ##load background image, and the main menu text
+        self.background = assets.getImage('Background.png')
+        self.menuText = assets.getImage('Main-Menu-Text.png')
+        startupTiming.mark("load menu assets")
+
+    def setupScreen(self):
+        ##pygame is only initialised once, and the window is only resized if a game changed its size
+        self.screen = display.getScreen((WIDTH, HEIGHT), "Main Menu!")
     
     def quit(self):
         pygame.quit()
@@ -25,6 +31,7 @@ class Main:
         aiButton = Button('Vs-AI', (75,205), self.screen)
         analysisButton = Button('Analysis', (75,295), self.screen)
         buttons = [pvpButton, aiButton, analysisButton]
+        startupTiming.mark("create buttons")
         while True:
             ##iterates through all events
             for event in pygame.event.get(): 
@@ -43,32 +50,39 @@ class Main:
                             ##if any button is clicked, then it selects the buttons name using a match case
                             match button.name:
                                 case 'PVP':
+                                    import Source.gamePlay as gamePlay
                                     ##calls pvp main method
                                     gamePlay.main('')
-                                    # after pvp.main() has stopped, it reconstructs the Main method
+                                    # after pvp.main() has stopped, the menu's screen is set up again
                                     # this clears the screen, effectively returning to the main menu
-                                    self.__init__()
+                                    self.setupScreen()
                                 
                                 ##repeated for other modules
                                 case 'Vs-AI':
+                                    import Source.gamePlay as gamePlay
                                     gamePlay.main('AI')
-                                    self.__init__()
+                                    self.setupScreen()
                                 case 'Analysis':
+                                    import Source.analysis as analysis
                                     analysis.main()
-                                    self.__init__()
+                                    self.setupScreen()
             
             ##CODE TO DRAW SCREEN
 
             ##blit background onto screens
             self.screen.blit(self.background, (0,0))
             ##blit main menu text onto screen
-            self.screen.blit(pygame.image.load(os.path.join('Assets/Main-Menu-Text.png')), (61, 0))
+            self.screen.blit(self.menuText, (61, 0))
             for button in buttons:
                 if button.hover:
                     button.draw_hover()
                 else:
                     button.draw_button()
             pygame.display.update()
+            #prints the startup timing after the first frame, if it was asked for
+            if startupTiming.ENABLED and not startupTiming.reported:
+                startupTiming.mark("draw first frame")
+                startupTiming.report()
 
 def main():
     menu = Main()
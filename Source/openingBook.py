@@ -0,0 +1,141 @@
+#OPENING BOOK
+#looks positions up in a Polyglot .bin opening book. the file is a list of 16 byte entries sorted by
+#position key, so the moves for a position are found by a binary search. the file is memory mapped
+#read only, so it is only read from disk as entries are looked at, and the operating system shares
+#the same pages between every process that has the book open.
+import mmap
+import os
+import random
+import struct
+import Source.bitboard as bitboard
+import Source.chessLogic as chessLogic
+import Source.polyglotKeys as polyglotKeys
+
+#each entry is a key, a move, a weight and a learn value, all big endian
+ENTRY = struct.Struct('>QHHI')
+KEY = struct.Struct('>Q')
+
+#the order Polyglot numbers the pieces in, black before white for each type
+POLYGLOTPIECES = 'pPnNbBrRqQkK'
+
+#the piece letter for each Polyglot promotion number, 0 meaning no promotion
+POLYGLOTPROMOTIONS = [None, 'n', 'b', 'r', 'q']
+
+def getPolyglotKey(board):
+    #the Polyglot hash of a position. Polyglot numbers ranks from white's side, so rank = 7 - row
+    key = 0
+    for piece, squares in board.pieceSquares.items():
+        pieceOffset = 64 * POLYGLOTPIECES.index(piece)
+        for row, col in squares:
+            key ^= polyglotKeys.RANDOM64[polyglotKeys.PIECEOFFSET + pieceOffset + 8*(7 - row) + col]
+
+    #the castling bits are in the same order as Polyglot's, white king side first
+    for right in range(4):
+        if board.castlingRights & (1 << right):
+            key ^= polyglotKeys.RANDOM64[polyglotKeys.CASTLINGOFFSET + right]
+
+    #the en passant file only counts if a pawn of the side to move could actually capture
+    if board.enPassantSquare is not None:
+        enemyColour = 'b' if board.playerToMove == 'W' else 'W'
+        pawn = 'P' if board.playerToMove == 'W' else 'p'
+        capturingPawns = bitboard.PAWNATTACKS[enemyColour][board.enPassantSquare]
+        if any(capturingPawns & (1 << bitboard.squareOf(row, col)) for row, col in board.pieceSquares[pawn]):
+            key ^= polyglotKeys.RANDOM64[polyglotKeys.ENPASSANTOFFSET + (board.enPassantSquare & 7)]
+
+    if board.playerToMove == 'W':
+        key ^= polyglotKeys.RANDOM64[polyglotKeys.TURNOFFSET]
+    return key
+
+def decodePolyglotMove(board, polyglotMove, legalMoves):
+    #turns a Polyglot move into the matching move from legalMoves, or None if it is not legal
+    toCol = polyglotMove & 7
+    toRow = 7 - ((polyglotMove >> 3) & 7)
+    fromCol = (polyglotMove >> 6) & 7
+    fromRow = 7 - ((polyglotMove >> 9) & 7)
+    promotionPiece = POLYGLOTPROMOTIONS[(polyglotMove >> 12) & 7]
+
+    #Polyglot writes castling as the king taking its own rook
+    piece = board.currentPos[fromRow][fromCol]
+    if piece in ('K', 'k') and fromCol == 4 and toCol in (0, 7):
+        toCol = 6 if toCol == 7 else 2
+
+    for move in legalMoves:
+        if chessLogic.getMoveInitial(move) == (fromRow, fromCol) and chessLogic.getMoveFinal(move) == (toRow, toCol):
+            if chessLogic.getPromotionPiece(move) == promotionPiece:
+                return move
+    return None
+
+class OpeningBook:
+    def __init__(self, path):
+        self.path = path
+        #the file is only opened when a position is first looked up
+        self.mapped = None
+        self.entryCount = 0
+
+    def open(self):
+        #returns False if there is no usable book at the path
+        if self.mapped is None:
+            if not os.path.isfile(self.path) or os.path.getsize(self.path) < ENTRY.size:
+                return False
+            with open(self.path, 'rb') as bookFile:
+                self.mapped = mmap.mmap(bookFile.fileno(), 0, access=mmap.ACCESS_READ)
+            self.entryCount = len(self.mapped) // ENTRY.size
+        return True
+
+    def close(self):
+        if self.mapped is not None:
+            self.mapped.close()
+            self.mapped = None
+
+    def findFirstEntry(self, key):
+        #binary search for the first entry with this key, or where it would be
+        low = 0
+        high = self.entryCount
+        while low < high:
+            middle = (low + high) // 2
+            if KEY.unpack_from(self.mapped, middle * ENTRY.size)[0] < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def getEntries(self, board):
+        #returns a list of (move, weight) for every book move in the position
+        if not self.open():
+            return []
+        key = getPolyglotKey(board)
+        entries = []
+        legalMoves = None
+        index = self.findFirstEntry(key)
+        while index < self.entryCount:
+            entryKey, polyglotMove, weight, learn = ENTRY.unpack_from(self.mapped, index * ENTRY.size)
+            if entryKey != key:
+                break
+            #the legal moves are only generated once the position is known to be in the book
+            if legalMoves is None:
+                legalMoves = chessLogic.getAllLegalMoves(board)
+            move = decodePolyglotMove(board, polyglotMove, legalMoves)
+            if move is not None:
+                entries.append((move, weight))
+            index += 1
+        return entries
+
+    def getMove(self, board, weighted=True, generator=random):
+        #picks a book move, at random in proportion to the weights, or the highest weighted move.
+        #returns None if the position is not in the book
+        entries = self.getEntries(board)
+        if len(entries) == 0:
+            return None
+        if weighted:
+            totalWeight = sum(weight for move, weight in entries)
+            if totalWeight > 0:
+                return generator.choices([move for move, weight in entries], [weight for move, weight in entries])[0]
+        return max(entries, key=lambda entry: entry[1])[0]
+
+#books that have been opened, by path, so every search in a process shares one mapping
+openBooks = {}
+
+def getBook(path):
+    if path not in openBooks:
+        openBooks[path] = OpeningBook(path)
+    return openBooks[path]
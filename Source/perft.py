@@ -0,0 +1,131 @@
+#PERFT
+#counts every leaf node of the legal move tree to a given depth. the counts for the standard
+#positions below are well known, so this checks the move generator is correct and measures its speed.
+#run from the project folder, e.g.
+#   python -m Source.perft --position kiwipete --depth 3 --divide --workers 4
+import argparse
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+import Source.chessLogic as chessLogic
+
+#the standard perft positions, with the known node count for depth 1, 2, 3...
+POSITIONS = {
+    "start": ("rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1",
+              [20, 400, 8902, 197281, 4865609]),
+    "kiwipete": ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+                 [48, 2039, 97862, 4085603]),
+    "position3": ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+                  [14, 191, 2812, 43238, 674624]),
+    "position4": ("r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+                  [6, 264, 9467, 422333]),
+    "position5": ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+                  [44, 1486, 62379, 2103487]),
+    "position6": ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                  [46, 2079, 89890, 3894594])
+}
+
+
+def makeBoard(fen, useBitboards=True):
+    #the side to move, castling rights and en passant square are all read from the FEN
+    return chessLogic.Board(fen, useBitboards=useBitboards)
+
+def perft(board, depth):
+    if depth == 0:
+        return 1
+    legalMoves = chessLogic.getAllLegalMoves(board)
+    #at the last ply the moves only need counting, not making
+    if depth == 1:
+        return len(legalMoves)
+
+    nodes = 0
+    for move in legalMoves:
+        board.makeFullMove(move)
+        nodes += perft(board, depth - 1)
+        board.undoMove()
+    return nodes
+
+def perftAfterMove(fen, useBitboards, moveName, depth):
+    #counts the nodes below a single root move. used by the worker processes,
+    #which rebuild the board from the FEN, as boards are not shared between processes.
+    board = makeBoard(fen, useBitboards)
+    for move in chessLogic.getAllLegalMoves(board):
+        if chessLogic.getMoveName(move) == moveName:
+            board.makeFullMove(move)
+            return perft(board, depth - 1)
+    raise ValueError("move " + moveName + " is not legal in " + fen)
+
+def divide(fen, depth, workers=1, useBitboards=True):
+    #returns a list of (move name, node count) pairs, one for each root move
+    board = makeBoard(fen, useBitboards)
+    moveNames = [chessLogic.getMoveName(move) for move in chessLogic.getAllLegalMoves(board)]
+
+    if workers > 1 and depth > 1:
+        #each root move is counted in a separate process
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            counts = pool.map(perftAfterMove, [fen]*len(moveNames), [useBitboards]*len(moveNames), moveNames, [depth]*len(moveNames))
+            return list(zip(moveNames, counts))
+
+    return [(moveName, perftAfterMove(fen, useBitboards, moveName, depth)) for moveName in moveNames]
+
+def runPosition(name, fen, depth, expected=None, showDivide=False, workers=1, useBitboards=True):
+    #runs perft on one position and prints the result. returns True if the count matches the known value
+    start = time.perf_counter()
+    if showDivide or workers > 1:
+        moveCounts = divide(fen, depth, workers, useBitboards)
+        nodes = sum(count for moveName, count in moveCounts)
+    else:
+        nodes = perft(makeBoard(fen, useBitboards), depth)
+    elapsed = time.perf_counter() - start
+
+    if showDivide:
+        for moveName, count in moveCounts:
+            print(f"  {moveName}: {count}")
+
+    nodesPerSecond = nodes / elapsed if elapsed > 0 else 0
+    if expected is None:
+        status = ""
+    elif nodes == expected:
+        status = "OK"
+    else:
+        status = f"FAIL (expected {expected})"
+    print(f"{name:<10} depth {depth}  nodes {nodes:>10}  {elapsed:8.2f}s  {nodesPerSecond:>10.0f} nodes/s  {status}")
+    return expected is None or nodes == expected
+
+def positiveInt(text):
+    #the known counts start at depth 1, so lower depths are rejected
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError(f"must be at least 1, not {value}")
+    return value
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Perft node counts for chessLogic move generation")
+    parser.add_argument("--position", choices=list(POSITIONS), help="standard position to run, all of them if not given")
+    parser.add_argument("--fen", help="run a custom position instead of the standard ones")
+    parser.add_argument("--depth", type=positiveInt, default=3, help="search depth in plies, at least 1 (default 3)")
+    parser.add_argument("--divide", action="store_true", help="print the node count below each root move")
+    parser.add_argument("--workers", type=int, default=1, help="processes to split the root moves across")
+    parser.add_argument("--mailbox", action="store_true", help="use the square scanning backend instead of bitboards")
+    arguments = parser.parse_args(arguments)
+
+    if arguments.fen:
+        runs = [("custom", arguments.fen, None)]
+    else:
+        names = [arguments.position] if arguments.position else list(POSITIONS)
+        runs = []
+        for name in names:
+            fen, counts = POSITIONS[name]
+            #positions without a known count at this depth are still run, just not checked
+            expected = counts[arguments.depth - 1] if arguments.depth <= len(counts) else None
+            runs.append((name, fen, expected))
+
+    allPassed = True
+    for name, fen, expected in runs:
+        passed = runPosition(name, fen, arguments.depth, expected, arguments.divide, arguments.workers, not arguments.mailbox)
+        allPassed = allPassed and passed
+
+    return 0 if allPassed else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,60 @@
+#SEARCH BENCHMARK
+#searches the standard perft positions to a fixed depth with different numbers of worker processes,
+#and prints the time to reach the depth, the nodes searched and the speedup over one process.
+#run from the project folder, e.g.
+#   python -m Source.searchBenchmark --depth 5 --workers 1 2 4
+import argparse
+import os
+import sys
+import time
+import Source.chessLogic as chessLogic
+import Source.chessEngine as chessEngine
+import Source.uci as uci
+from Source.perft import POSITIONS, positiveInt
+
+def searchToDepth(fen, depth, workers, searchMode):
+    #returns (seconds, nodes, best move name) for one search. each search has a new table, so no
+    #search is helped by the one before. the book and tablebases are off, so every position is searched,
+    #and the only limit is the depth
+    board = chessLogic.Board(fen)
+    chessAI = chessEngine.ChessAI(board, board.playerToMove)
+    chessAI.WORKERS = workers
+    chessAI.SEARCHMODE = searchMode
+    chessAI.MAXDEPTH = depth
+    chessAI.USEBOOK = False
+    chessAI.USETABLEBASES = False
+    start = time.perf_counter()
+    move = chessAI.getBestMove(board, chessLogic.getAllLegalMoves(board), uci.INFINITETIME)
+    return time.perf_counter() - start, chessAI.nodes, chessLogic.getMoveName(move)
+
+def main(arguments=None):
+    parser = argparse.ArgumentParser(description="Time to depth of the AI search with different numbers of worker processes")
+    parser.add_argument("--position", choices=list(POSITIONS), help="standard position to search, all of them if not given")
+    parser.add_argument("--depth", type=positiveInt, default=5, help="search depth in plies (default 5)")
+    parser.add_argument("--workers", type=positiveInt, nargs="+", default=[1, 2, 4], help="worker counts to compare (default 1 2 4)")
+    parser.add_argument("--searchmode", choices=["selective", "fullwidth"], default=chessEngine.SEARCHMODE, help="search mode to use")
+    arguments = parser.parse_args(arguments)
+
+    names = [arguments.position] if arguments.position else list(POSITIONS)
+    print(f"{os.cpu_count()} CPUs, depth {arguments.depth}, {arguments.searchmode} search")
+    baseTime = None
+    for workers in arguments.workers:
+        #the worker processes are started before the clock, so their start up is not counted
+        if workers > 1:
+            list(chessEngine.getWorkerPool(workers).map(len, [""] * workers))
+        totalTime = 0.0
+        totalNodes = 0
+        for name in names:
+            fen = POSITIONS[name][0]
+            seconds, nodes, moveName = searchToDepth(fen, arguments.depth, workers, arguments.searchmode)
+            totalTime += seconds
+            totalNodes += nodes
+            print(f"  {name:<10} workers {workers}  {moveName:<6} {seconds:8.2f}s  nodes {nodes:>9}")
+        if baseTime is None:
+            baseTime = totalTime
+        nodesPerSecond = totalNodes / totalTime if totalTime > 0 else 0
+        print(f"workers {workers}  {totalTime:8.2f}s  nodes {totalNodes:>9}  {nodesPerSecond:>8.0f} nodes/s  speedup {baseTime / totalTime:.2f}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,101 @@
+#SEARCH STATISTICS
+#counts what a search did, so it is possible to see why a move took as long as it did.
+#ChessAI only makes a SearchStats when COLLECTSTATS is on. otherwise its stats are None and the
+#search skips every count, so turning them off costs one check per node.
+import time
+
+class SearchStats:
+    def __init__(self, fen):
+        #the position searched, and where the move came from: "search", "book" or "tablebase"
+        self.fen = fen
+        self.source = "search"
+        self.startTime = time.perf_counter()
+        self.elapsed = 0.0
+        #nodes counts every node, including the quiescence nodes
+        self.nodes = 0
+        self.quiescenceNodes = 0
+        #cut offs in the main search, and how many came from the first move searched
+        self.betaCutoffs = 0
+        self.firstMoveCutoffs = 0
+        self.nullMoveCutoffs = 0
+        #transposition table probes in the main search, the probes that found the position,
+        #and the probes whose stored score was used without searching
+        self.hashProbes = 0
+        self.hashHits = 0
+        self.hashCutoffs = 0
+        self.tablebaseHits = 0
+        #one entry for each iteration that finished, see addIteration
+        self.iterations = []
+        self.bestMove = None
+        self.score = None
+        self.principalVariation = []
+
+    def addIteration(self, depth, score, nodes, principalVariation):
+        #records an iteration of iterative deepening. the node count and time are the totals so far
+        self.iterations.append({
+            "depth": depth,
+            "score": score,
+            "nodes": nodes,
+            "time": round(time.perf_counter() - self.startTime, 4),
+            "principalVariation": principalVariation
+        })
+
+    def finish(self, nodes, bestMove, score, principalVariation):
+        self.elapsed = time.perf_counter() - self.startTime
+        self.nodes = nodes
+        self.bestMove = bestMove
+        self.score = score
+        self.principalVariation = principalVariation
+
+    @property
+    def nodesPerSecond(self):
+        return self.nodes / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def firstMoveCutoffRate(self):
+        #how often the move ordering put the refuting move first. close to 1 is good ordering
+        return self.firstMoveCutoffs / self.betaCutoffs if self.betaCutoffs else 0.0
+
+    @property
+    def hashHitRate(self):
+        return self.hashHits / self.hashProbes if self.hashProbes else 0.0
+
+    @property
+    def effectiveBranchingFactor(self):
+        #how many times more nodes each iteration took than the one before, on average
+        if len(self.iterations) < 2 or self.iterations[0]["nodes"] == 0:
+            return None
+        first = self.iterations[0]
+        last = self.iterations[-1]
+        return (last["nodes"] / first["nodes"]) ** (1 / (last["depth"] - first["depth"]))
+
+    def toDict(self):
+        branchingFactor = self.effectiveBranchingFactor
+        return {
+            "fen": self.fen,
+            "source": self.source,
+            "bestMove": self.bestMove,
+            "score": self.score,
+            "depth": self.iterations[-1]["depth"] if self.iterations else 0,
+            "time": round(self.elapsed, 4),
+            "nodes": self.nodes,
+            "quiescenceNodes": self.quiescenceNodes,
+            "nodesPerSecond": round(self.nodesPerSecond),
+            "betaCutoffs": self.betaCutoffs,
+            "firstMoveCutoffRate": round(self.firstMoveCutoffRate, 4),
+            "nullMoveCutoffs": self.nullMoveCutoffs,
+            "hashProbes": self.hashProbes,
+            "hashHitRate": round(self.hashHitRate, 4),
+            "hashCutoffs": self.hashCutoffs,
+            "tablebaseHits": self.tablebaseHits,
+            "effectiveBranchingFactor": round(branchingFactor, 3) if branchingFactor is not None else None,
+            "principalVariation": self.principalVariation,
+            "iterations": self.iterations
+        }
+
+    def writeLog(self, path):
+        #adds the stats to a log with one JSON object on each line.
+        #json is only imported when a log is written, so it does not slow down starting the engine
+        import json
+        with open(path, 'a') as logFile:
+            logFile.write(json.dumps(self.toDict()) + '\n')
@@ -0,0 +1,31 @@
+#STARTUP TIMING
+#records how long each step of starting the program takes, so a slow import or asset load shows up.
+#run  python main.py --timing  to print the steps once the main menu's first frame is drawn.
+#for the time taken by every single module,  python -X importtime main.py  gives the full breakdown
+import sys
+import time
+
+ENABLED = '--timing' in sys.argv
+#the steps are timed from when this module is imported, which is the first thing main.py does
+startTime = time.perf_counter()
+lastTime = startTime
+steps = []
+reported = False
+
+def mark(step):
+    #records the time since the last step
+    global lastTime
+    now = time.perf_counter()
+    steps.append((step, now - lastTime))
+    lastTime = now
+
+def report():
+    #prints the steps once, if timing is enabled
+    global reported
+    if not ENABLED or reported:
+        return
+    reported = True
+    print("startup timing")
+    for step, elapsed in steps:
+        print(f"  {step:<28} {elapsed * 1000:8.1f} ms")
+    print(f"  {'total':<28} {(lastTime - startTime) * 1000:8.1f} ms")
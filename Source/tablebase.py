@@ -0,0 +1,485 @@
+#ENDGAME TABLEBASES
+#tables holding the exact result of every position in an endgame with only a few pieces. they are
+#generated offline by retrograde analysis: the checkmates are found first, then positions are solved
+#one ply at a time backwards from them, until every won or lost position is known along with its
+#distance to mate. each table is a file with one byte per position, which is memory mapped, so a
+#probe is a single read and the operating system shares the pages between processes.
+#run from the project folder to generate tables, e.g.
+#   python -m Source.tablebase KQvK KRvK
+import mmap
+import os
+import sys
+import time
+from itertools import product
+import Source.bitboard as bitboard
+
+#the folder the tables are read from and written to
+TABLEBASEPATH = os.path.join("Assets", "Tablebases")
+
+#the most pieces, kings included, that a table can have
+MAXPIECES = 4
+
+#tables are named by the white pieces, then 'v', then the black pieces, each in this order.
+#the stronger side is always white in a table, so a position where black is stronger is probed
+#with the colours swapped
+PIECEORDER = 'KQRBNP'
+
+#the tables generated when no names are given
+DEFAULTTABLES = ['KQvK', 'KRvK', 'KPvK', 'KBNvK']
+
+#each position is one byte. 0 is a draw, 1-127 is a win for the side to move with mate in that many
+#moves, and LOSS + n is a loss for the side to move, being mated in n moves
+LOSS = 128
+#marks positions that cannot happen, or that are stored under another index, while a table is generated
+ILLEGAL = 255
+
+#the pieces a pawn can promote to
+PROMOTIONS = 'QRBN'
+
+
+#SYMMETRY
+#a position with its board mirrored gives the same result, so each table only stores the positions
+#with the white king on part of the board. without pawns the board can be mirrored across files,
+#ranks and the diagonal, which leaves the white king in the triangle a1-d1-d4. pawns only move one
+#way, so with pawns the board can only be mirrored across files, leaving the white king on files a-d
+def transformSquare(square, transform):
+    row, col = bitboard.COORDS[square]
+    if transform & 1:
+        col = 7 - col
+    if transform & 2:
+        row = 7 - row
+    if transform & 4:
+        row, col = col, row
+    return row*8 + col
+
+TRANSFORMS = [[transformSquare(square, transform) for square in range(64)] for transform in range(8)]
+
+def isKingRegion(square, hasPawns):
+    row, col = bitboard.COORDS[square]
+    if hasPawns:
+        return col <= 3
+    return col <= 3 and row >= 4 and 7 - row <= col
+
+
+def getTableName(pieces):
+    #returns the name of the table for a list of piece letters, and whether the colours have to be
+    #swapped to probe it, as the stronger side is always white
+    whitePieces = ''.join(sorted((piece for piece in pieces if piece.isupper()), key=PIECEORDER.index))
+    blackPieces = ''.join(sorted((piece.upper() for piece in pieces if piece.islower()), key=PIECEORDER.index))
+
+    #more pieces is stronger, then more valuable pieces
+    def strength(side):
+        return (-len(side), [PIECEORDER.index(piece) for piece in side])
+
+    if strength(blackPieces) < strength(whitePieces):
+        return blackPieces + 'v' + whitePieces, True
+    return whitePieces + 'v' + blackPieces, False
+
+def parseTableName(name):
+    #the piece letters of a table name, white in upper case and black in lower case
+    whitePieces, blackPieces = name.split('v')
+    return list(whitePieces) + list(blackPieces.lower())
+
+def decodeValue(value):
+    #returns (result, plies to mate) for the side to move, with a result of 1 for a win, 0 for a draw
+    #and -1 for a loss. a win takes an odd number of plies and a loss an even number
+    if value == 0:
+        return 0, 0
+    if value < LOSS:
+        return 1, 2*value - 1
+    return -1, 2*(value - LOSS)
+
+def encodeValue(result, plies):
+    if result > 0:
+        return (plies + 1) // 2
+    return LOSS + plies // 2
+
+
+class Table:
+    def __init__(self, name):
+        self.name = name
+        #the piece on each square of a position, in the order the squares are indexed. the white king is first
+        self.pieces = parseTableName(name)
+        self.hasPawns = 'P' in name
+        self.region = [square for square in range(64) if isKingRegion(square, self.hasPawns)]
+        self.regionIndex = {square: index for index, square in enumerate(self.region)}
+        transforms = (0, 1) if self.hasPawns else range(8)
+        #the mirrors that move the white king on each square into its region
+        self.kingTransforms = [[transform for transform in transforms if TRANSFORMS[transform][square] in self.regionIndex]
+                               for square in range(64)]
+        #(start, end) for each run of two or more identical pieces. their squares are kept sorted,
+        #so swapping two identical pieces gives the same index
+        self.groups = []
+        start = 0
+        for end in range(1, len(self.pieces) + 1):
+            if end == len(self.pieces) or self.pieces[end] != self.pieces[start]:
+                if end - start > 1:
+                    self.groups.append((start, end))
+                start = end
+        #white to move comes first, then black to move
+        self.sideSize = len(self.region) * 64 ** (len(self.pieces) - 1)
+        self.size = 2 * self.sideSize
+        #the byte for each position, a memory map once the table has been loaded from disk
+        self.data = None
+
+    def getIndex(self, squares, whiteToMove):
+        #the index of a position, given the square of each piece in self.pieces order.
+        #a position with the white king on the edge of its region can be mirrored onto itself in more
+        #than one way, so the smallest index is used, to give every copy of the position the same index
+        bestIndex = None
+        for transform in self.kingTransforms[squares[0]]:
+            mirrored = [TRANSFORMS[transform][square] for square in squares]
+            for start, end in self.groups:
+                mirrored[start:end] = sorted(mirrored[start:end])
+            index = self.regionIndex[mirrored[0]]
+            for square in mirrored[1:]:
+                index = index*64 + square
+            if bestIndex is None or index < bestIndex:
+                bestIndex = index
+        return bestIndex if whiteToMove else bestIndex + self.sideSize
+
+    def getSquares(self, index):
+        #the inverse of getIndex, returns (squares, whiteToMove)
+        whiteToMove = index < self.sideSize
+        index %= self.sideSize
+        squares = []
+        for piece in range(len(self.pieces) - 1):
+            index, square = divmod(index, 64)
+            squares.append(square)
+        squares.append(self.region[index])
+        squares.reverse()
+        return squares, whiteToMove
+
+    def probe(self, squares, whiteToMove):
+        return decodeValue(self.data[self.getIndex(squares, whiteToMove)])
+
+
+class Tablebases:
+    #the tables in one folder. each table is only opened the first time it is probed
+    def __init__(self, path):
+        self.path = path
+        #tables by name, or None for tables that have no file
+        self.tables = {}
+        #the search only probes if there is at least one table
+        self.available = os.path.isdir(path) and any(fileName.endswith('.tb') for fileName in os.listdir(path))
+
+    def getTable(self, name):
+        if name not in self.tables:
+            table = None
+            filePath = os.path.join(self.path, name + '.tb')
+            if os.path.isfile(filePath):
+                table = Table(name)
+                with open(filePath, 'rb') as tableFile:
+                    #a file of the wrong size was made by a different version, so it is ignored
+                    if os.path.getsize(filePath) == table.size:
+                        table.data = mmap.mmap(tableFile.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        table = None
+            self.tables[name] = table
+        return self.tables[name]
+
+    def probePieces(self, pieces, squares, whiteToMove):
+        #returns (result, plies to mate) for the side to move, or None if there is no table.
+        #the pieces and squares can be in any order
+        name, swapColours = getTableName(pieces)
+        table = self.getTable(name)
+        if table is None:
+            return None
+        if swapColours:
+            #mirroring the ranks and swapping the colours gives the same position for the other side
+            pieces = [piece.swapcase() for piece in pieces]
+            squares = [square ^ 56 for square in squares]
+            whiteToMove = not whiteToMove
+        #puts the squares in the order the table indexes them
+        squaresByPiece = {}
+        for piece, square in zip(pieces, squares):
+            squaresByPiece.setdefault(piece, []).append(square)
+        orderedSquares = [squaresByPiece[piece].pop() for piece in table.pieces]
+        return table.probe(orderedSquares, whiteToMove)
+
+    def probe(self, board):
+        #returns (result, plies to mate) for the side to move on a board, or None if it cannot be probed.
+        #the tables do not know about castling or en passant, so positions with them are not probed
+        if not self.available or board.castlingRights:
+            return None
+        if sum(map(len, board.pieceSquares.values())) > MAXPIECES:
+            return None
+        pieces = []
+        squares = []
+        for piece, pieceSquares in board.pieceSquares.items():
+            for row, col in pieceSquares:
+                pieces.append(piece)
+                squares.append(row*8 + col)
+        #the en passant square only matters if a pawn can actually capture
+        if board.enPassantSquare is not None:
+            enemyColour = 'b' if board.playerToMove == 'W' else 'W'
+            pawn = 'P' if board.playerToMove == 'W' else 'p'
+            capturingPawns = bitboard.PAWNATTACKS[enemyColour][board.enPassantSquare]
+            if any(capturingPawns & (1 << square) for piece, square in zip(pieces, squares) if piece == pawn):
+                return None
+        return self.probePieces(pieces, squares, board.playerToMove == 'W')
+
+#tablebases that have been opened, by folder, so every search in a process shares them
+openTablebases = {}
+
+def getTablebases(path=TABLEBASEPATH):
+    if path not in openTablebases:
+        openTablebases[path] = Tablebases(path)
+    return openTablebases[path]
+
+
+#GENERATION
+def getAttacks(piece, square, occupancy):
+    #the squares a piece attacks, as a bitboard
+    kind = piece.upper()
+    if kind == 'K':
+        return bitboard.KINGATTACKS[square]
+    if kind == 'N':
+        return bitboard.KNIGHTATTACKS[square]
+    if kind == 'B':
+        return bitboard.bishopAttacks(square, occupancy)
+    if kind == 'R':
+        return bitboard.rookAttacks(square, occupancy)
+    if kind == 'Q':
+        return bitboard.queenAttacks(square, occupancy)
+    return bitboard.PAWNATTACKS['W' if piece == 'P' else 'b'][square]
+
+def getOccupancy(squares):
+    occupancy = 0
+    for square in squares:
+        occupancy |= 1 << square
+    return occupancy
+
+def isAttacked(pieces, squares, square, byWhite, occupancy):
+    #returns True if a piece of the given colour attacks the square
+    for piece, pieceSquare in zip(pieces, squares):
+        if piece.isupper() == byWhite and getAttacks(piece, pieceSquare, occupancy) >> square & 1:
+            return True
+    return False
+
+def isLegalPosition(pieces, squares, whiteToMove):
+    #no two pieces on a square, no pawns on the back ranks, and the side that just moved is not in check
+    if len(set(squares)) != len(squares):
+        return False
+    for piece, square in zip(pieces, squares):
+        if piece in 'Pp' and square >> 3 in (0, 7):
+            return False
+    kingSquare = squares[pieces.index('k' if whiteToMove else 'K')]
+    return not isAttacked(pieces, squares, kingSquare, whiteToMove, getOccupancy(squares))
+
+def getChildren(pieces, squares, whiteToMove):
+    #yields (pieces, squares) after every legal move. the pieces list is the same object unless
+    #the move was a capture or a promotion, which lead to another table.
+    #castling and en passant are not possible in the tables
+    occupancy = getOccupancy(squares)
+    ownPieces = getOccupancy(square for piece, square in zip(pieces, squares) if piece.isupper() == whiteToMove)
+    king = 'K' if whiteToMove else 'k'
+
+    for index, piece in enumerate(pieces):
+        if piece.isupper() != whiteToMove:
+            continue
+        square = squares[index]
+        if piece in 'Pp':
+            #white pawns move up the board, towards row 0
+            step = -8 if piece == 'P' else 8
+            startRow = 6 if piece == 'P' else 1
+            targets = []
+            if not occupancy >> (square + step) & 1:
+                targets.append(square + step)
+                if square >> 3 == startRow and not occupancy >> (square + 2*step) & 1:
+                    targets.append(square + 2*step)
+            targets += bitboard.squares(getAttacks(piece, square, occupancy) & occupancy & ~ownPieces)
+        else:
+            targets = bitboard.squares(getAttacks(piece, square, occupancy) & ~ownPieces)
+
+        for target in targets:
+            childPieces = pieces
+            childSquares = squares[:]
+            childSquares[index] = target
+            movedIndex = index
+            if occupancy >> target & 1:
+                capturedIndex = squares.index(target)
+                childPieces = pieces[:capturedIndex] + pieces[capturedIndex+1:]
+                del childSquares[capturedIndex]
+                if capturedIndex < index:
+                    movedIndex -= 1
+
+            #the king must not be left in check
+            kingSquare = childSquares[childPieces.index(king)]
+            if isAttacked(childPieces, childSquares, kingSquare, not whiteToMove, getOccupancy(childSquares)):
+                continue
+
+            if piece in 'Pp' and target >> 3 in (0, 7):
+                for promotion in PROMOTIONS:
+                    promotedPieces = childPieces[:]
+                    promotedPieces[movedIndex] = promotion if whiteToMove else promotion.lower()
+                    yield promotedPieces, childSquares
+            else:
+                yield childPieces, childSquares
+
+def getParents(pieces, squares, whiteToMove):
+    #yields the squares before every move, other than a capture or promotion, that could have led to
+    #this position. the side that made the move is the one not to move now
+    occupancy = getOccupancy(squares)
+    for index, piece in enumerate(pieces):
+        if piece.isupper() == whiteToMove:
+            continue
+        square = squares[index]
+        row = square >> 3
+        if piece == 'P':
+            origins = []
+            if row <= 5 and not occupancy >> (square + 8) & 1:
+                origins.append(square + 8)
+                if row == 4 and not occupancy >> (square + 16) & 1:
+                    origins.append(square + 16)
+        elif piece == 'p':
+            origins = []
+            if row >= 2 and not occupancy >> (square - 8) & 1:
+                origins.append(square - 8)
+                if row == 3 and not occupancy >> (square - 16) & 1:
+                    origins.append(square - 16)
+        else:
+            #pieces other than pawns move the same way backwards as forwards
+            origins = bitboard.squares(getAttacks(piece, square, occupancy) & ~occupancy)
+        for origin in origins:
+            parentSquares = squares[:]
+            parentSquares[index] = origin
+            yield parentSquares
+
+def getSubtableNames(name):
+    #the tables a capture or promotion from this table can lead to
+    pieces = Table(name).pieces
+    names = set()
+    for index, piece in enumerate(pieces):
+        if piece in 'Kk':
+            continue
+        names.add(getTableName(pieces[:index] + pieces[index+1:])[0])
+        if piece in 'Pp':
+            for promotion in PROMOTIONS:
+                promoted = pieces[:]
+                promoted[index] = promotion if piece == 'P' else promotion.lower()
+                names.add(getTableName(promoted)[0])
+    return sorted(names)
+
+def generateTable(name, tablebases, log=print):
+    #solves every position of a table and writes it to the tablebase folder.
+    #the tables it leads to by captures and promotions are generated first if they are missing
+    for subtableName in getSubtableNames(name):
+        if tablebases.getTable(subtableName) is None:
+            generateTable(subtableName, tablebases, log)
+    startTime = time.perf_counter()
+    table = Table(name)
+    values = bytearray(table.size)
+    #the number of moves from each position not yet known to be a win for the opponent.
+    #once it reaches zero every move loses, so the position is lost
+    counters = bytearray(table.size)
+    #positions solved at each ply, and positions whose moves out of the table give a win, or lead
+    #to a position the opponent wins, at each ply
+    solved = {}
+    exitWins = {}
+    exitLosses = {}
+
+    #first pass: finds the checkmates, counts the moves from each position and looks up the moves out of the table
+    for index in range(table.size):
+        squares, whiteToMove = table.getSquares(index)
+        if table.getIndex(squares, whiteToMove) != index or not isLegalPosition(table.pieces, squares, whiteToMove):
+            counters[index] = ILLEGAL
+            continue
+        children = set()
+        exitCount = 0
+        for childPieces, childSquares in getChildren(table.pieces, squares, whiteToMove):
+            if childPieces is table.pieces:
+                #moves to the same position, mirrored, are only counted once, as they are only found once going backwards
+                children.add(table.getIndex(childSquares, not whiteToMove))
+                continue
+            exitCount += 1
+            result, plies = tablebases.probePieces(childPieces, childSquares, not whiteToMove)
+            if result < 0:
+                exitWins.setdefault(plies + 1, []).append(index)
+            elif result > 0:
+                exitLosses.setdefault(plies, []).append(index)
+        moveCount = len(children) + exitCount
+        counters[index] = moveCount
+        #with no moves the side to move is checkmated if it is in check, otherwise it is stalemate
+        if moveCount == 0:
+            kingSquare = squares[table.pieces.index('K' if whiteToMove else 'k')]
+            if isAttacked(table.pieces, squares, kingSquare, not whiteToMove, getOccupancy(squares)):
+                values[index] = encodeValue(-1, 0)
+                solved.setdefault(0, []).append(index)
+
+    def isUnsolved(index):
+        return values[index] == 0 and counters[index] != ILLEGAL
+
+    def countLosingMove(index, ply):
+        #one more move from the position is known to lose. if it was the last one, the position is lost
+        counters[index] -= 1
+        if counters[index] == 0:
+            values[index] = encodeValue(-1, ply)
+            solved.setdefault(ply, []).append(index)
+
+    #RETROGRADE ANALYSIS
+    #the positions solved at each ply are taken back one move. a position with a move to a lost
+    #position is won one ply later, and a position whose moves all lead to won positions is lost
+    ply = 0
+    while solved or exitWins or exitLosses:
+        for index in exitWins.pop(ply, []):
+            if isUnsolved(index):
+                values[index] = encodeValue(1, ply)
+                solved.setdefault(ply, []).append(index)
+        for index in exitLosses.pop(ply - 1, []):
+            if isUnsolved(index):
+                countLosingMove(index, ply)
+
+        for index in solved.pop(ply, []):
+            squares, whiteToMove = table.getSquares(index)
+            isLoss = values[index] >= LOSS
+            parents = {table.getIndex(parentSquares, not whiteToMove) for parentSquares in getParents(table.pieces, squares, whiteToMove)}
+            for parent in parents:
+                if not isUnsolved(parent):
+                    continue
+                if isLoss:
+                    values[parent] = encodeValue(1, ply + 1)
+                    solved.setdefault(ply + 1, []).append(parent)
+                else:
+                    countLosingMove(parent, ply + 1)
+        ply += 1
+
+    os.makedirs(tablebases.path, exist_ok=True)
+    with open(os.path.join(tablebases.path, name + '.tb'), 'wb') as tableFile:
+        tableFile.write(values)
+    tablebases.tables.pop(name, None)
+    tablebases.available = True
+    longestMate = max((decodeValue(value)[1] for value in set(values)), default=0)
+    log(f"{name:<8} {table.size:>10} positions  longest mate {(longestMate + 1) // 2:>3} moves  {time.perf_counter() - startTime:8.1f}s")
+
+def getAllTableNames(maxPieces=MAXPIECES):
+    #every table with up to maxPieces pieces, kings included
+    names = set()
+    for pieceCount in range(2, maxPieces + 1):
+        for otherPieces in product(PIECEORDER[1:], repeat=pieceCount - 2):
+            for whiteCount in range(len(otherPieces) + 1):
+                pieces = ['K', 'k'] + list(otherPieces[:whiteCount]) + [piece.lower() for piece in otherPieces[whiteCount:]]
+                names.add(getTableName(pieces)[0])
+    return sorted(names, key=lambda name: (len(name), name))
+
+def main(arguments=None):
+    #argparse is only needed to generate tables, not to probe them from the engine
+    import argparse
+    parser = argparse.ArgumentParser(description="Generates endgame tablebases by retrograde analysis")
+    parser.add_argument("tables", nargs="*", help=f"tables to generate, e.g. KQvK (default {' '.join(DEFAULTTABLES)})")
+    parser.add_argument("--all", action="store_true", help=f"generate every table with up to {MAXPIECES} pieces")
+    parser.add_argument("--path", default=TABLEBASEPATH, help="folder the tables are written to")
+    parser.add_argument("--force", action="store_true", help="generate the tables even if they already exist")
+    arguments = parser.parse_args(arguments)
+
+    names = getAllTableNames() if arguments.all else arguments.tables or DEFAULTTABLES
+    tablebases = Tablebases(arguments.path)
+    for name in names:
+        #the name is put in the standard form, so KvKQ and KQvK are the same table
+        name = getTableName(parseTableName(name))[0]
+        if arguments.force or tablebases.getTable(name) is None:
+            generateTable(name, tablebases)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,63 @@
+#TRANSPOSITION TABLE
+#stores the result of searching a position, keyed by its zobrist key, so a position reached again
+#through a different move order does not have to be searched from scratch.
+#the table has a fixed number of slots, worked out from its size in MB. the slots are kept in
+#arrays rather than as python objects, so the size given is close to the memory really used.
+from array import array
+
+#bound types. an exact score is the true score of the position, a lower bound means the search
+#failed high so the score is at least this, an upper bound means it failed low so it is at most this
+EXACT = 0
+LOWERBOUND = 1
+UPPERBOUND = 2
+
+#bytes used by one slot: an 8 byte key, an 8 byte score and 4 bytes for the move, depth, bound and age
+ENTRYSIZE = 20
+
+class TranspositionTable:
+    def __init__(self, sizeMB=16):
+        #the number of slots is a power of two, so a key is turned into a slot with a mask
+        slotCount = 1
+        while slotCount * 2 * ENTRYSIZE <= sizeMB * 1024 * 1024:
+            slotCount *= 2
+        self.mask = slotCount - 1
+        self.keys = array('Q', [0]) * slotCount
+        self.scores = array('d', [0.0]) * slotCount
+        #move in bits 0-15, depth in bits 16-23, bound in bits 24-25 and age in bits 26-31
+        self.data = array('I', [0]) * slotCount
+        #the age is moved on for every new search, so entries from old searches can be replaced first
+        self.age = 0
+
+    def newSearch(self):
+        self.age = (self.age + 1) & 63
+
+    def clear(self):
+        slotCount = self.mask + 1
+        self.keys = array('Q', [0]) * slotCount
+        self.scores = array('d', [0.0]) * slotCount
+        self.data = array('I', [0]) * slotCount
+
+    def probe(self, key):
+        #returns (depth, score, bound, best move) for the position, or None if it is not stored
+        slot = key & self.mask
+        if self.keys[slot] != key:
+            return None
+        data = self.data[slot]
+        #a move of 0 would be from a8 to a8, so it is used to mean there is no move stored
+        move = data & 0xFFFF
+        return (data >> 16) & 0xFF, self.scores[slot], (data >> 24) & 3, move if move != 0 else None
+
+    def store(self, key, depth, score, bound, move=None):
+        slot = key & self.mask
+        data = self.data[slot]
+        storedKey = self.keys[slot]
+        #the slot is replaced if it holds the same position, an entry from an older search,
+        #or a search that was no deeper than this one. otherwise the deeper result is kept
+        if storedKey != key and data >> 26 == self.age and (data >> 16) & 0xFF > depth:
+            return
+        #a result without a move keeps the move already stored for the same position
+        if move is None:
+            move = data & 0xFFFF if storedKey == key else 0
+        self.keys[slot] = key
+        self.scores[slot] = score
+        self.data[slot] = move | (min(depth, 255) << 16) | (bound << 24) | (self.age << 26)
@@ -0,0 +1,281 @@
+#UCI ENGINE
+#a headless entry point that speaks the Universal Chess Interface over stdin and stdout, so the AI can be
+#run by tournament managers and scripted clients. only the engine modules are imported, not pygame,
+#tkinter or python-chess, so it starts quickly.
+#run from anywhere with:  python uci.py
+import os
+import sys
+import threading
+import time
+import Source.chessLogic as chessLogic
+import Source.chessEngine as chessEngine
+import Source.tablebase as tablebase
+import Source.transposition as transposition
+
+ENGINENAME = "Chess AI"
+ENGINEAUTHOR = "OCR Computer Science NEA"
+
+STARTFEN = "rnbqkbnr/pppppppp/8/8/8/8/PPPPPPPP/RNBQKBNR w KQkq - 0 1"
+
+#a GUI can start the engine from any folder, so the asset paths are made relative to the project folder
+PROJECTPATH = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+#the moves a time control is planned over when the GUI does not say how many are left
+MOVESTOGO = 30
+#time kept back from every move for the GUI and the pipes, in milliseconds
+MOVEOVERHEAD = 50
+#the time limit for a search that only ends on stop, or on its depth or node limit, in seconds
+INFINITETIME = 1e9
+#the go arguments that are followed by a number
+GOLIMITS = ('depth', 'nodes', 'movetime', 'wtime', 'btime', 'winc', 'binc', 'movestogo')
+
+class UCIEngine:
+    def __init__(self, output=sys.stdout):
+        self.output = output
+        #the search thread and the command loop both write, so lines are written one at a time
+        self.outputLock = threading.Lock()
+        self.board = chessLogic.Board(STARTFEN)
+        self.hashSizeMB = chessEngine.HASHSIZEMB
+        #kept between moves, and cleared by ucinewgame
+        self.transpositionTable = transposition.TranspositionTable(self.hashSizeMB)
+        self.workers = chessEngine.WORKERS
+        self.useBook = True
+        self.bookPath = os.path.join(PROJECTPATH, chessEngine.BOOKPATH)
+        self.useTablebases = True
+        self.tablebasePath = os.path.join(PROJECTPATH, tablebase.TABLEBASEPATH)
+        self.searchMode = chessEngine.SEARCHMODE
+        self.moveOverhead = MOVEOVERHEAD
+        #the search running on its own thread, so stop and isready are answered while it thinks
+        self.chessAI = None
+        self.searchThread = None
+        self.searchStartTime = 0
+        #an infinite or pondering search holds its bestmove until this is set by stop or ponderhit
+        self.releaseEvent = threading.Event()
+
+    def send(self, line):
+        with self.outputLock:
+            self.output.write(line + '\n')
+            self.output.flush()
+
+    def handleCommand(self, line):
+        #runs one command. returns False once the engine should quit
+        words = line.split()
+        if len(words) == 0:
+            return True
+        command = words[0]
+        if command == 'uci':
+            self.sendIdentity()
+        elif command == 'isready':
+            self.send('readyok')
+        elif command == 'setoption':
+            self.stopSearch()
+            self.setOption(words[1:])
+        elif command == 'ucinewgame':
+            self.stopSearch()
+            self.transpositionTable.clear()
+        elif command == 'position':
+            self.stopSearch()
+            self.setPosition(words[1:])
+        elif command == 'go':
+            self.stopSearch()
+            self.go(words[1:])
+        elif command == 'stop':
+            self.stopSearch()
+        elif command == 'ponderhit':
+            self.ponderHit()
+        elif command == 'quit':
+            self.stopSearch()
+            return False
+        #the protocol says unknown commands are ignored
+        return True
+
+    def sendIdentity(self):
+        self.send(f'id name {ENGINENAME}')
+        self.send(f'id author {ENGINEAUTHOR}')
+        self.send(f'option name Hash type spin default {chessEngine.HASHSIZEMB} min 1 max 4096')
+        self.send(f'option name Threads type spin default {chessEngine.WORKERS} min 1 max 64')
+        self.send('option name Ponder type check default true')
+        self.send('option name OwnBook type check default true')
+        self.send(f'option name BookFile type string default {self.bookPath}')
+        self.send('option name UseTablebases type check default true')
+        self.send(f'option name TablebasePath type string default {self.tablebasePath}')
+        self.send(f'option name SearchMode type combo default {chessEngine.SEARCHMODE} var selective var fullwidth')
+        self.send(f'option name MoveOverhead type spin default {MOVEOVERHEAD} min 0 max 5000')
+        self.send('uciok')
+
+    def setOption(self, words):
+        #setoption name <name> value <value>, where both can contain spaces
+        if 'name' not in words:
+            return
+        valueIndex = words.index('value') if 'value' in words else len(words)
+        name = ' '.join(words[words.index('name')+1:valueIndex]).lower()
+        value = ' '.join(words[valueIndex+1:])
+        try:
+            if name == 'hash':
+                self.hashSizeMB = max(1, int(value))
+                self.transpositionTable = transposition.TranspositionTable(self.hashSizeMB)
+            elif name == 'threads':
+                self.workers = max(1, int(value))
+            elif name == 'ownbook':
+                self.useBook = value.lower() == 'true'
+            elif name == 'bookfile':
+                self.bookPath = value
+            elif name == 'usetablebases':
+                self.useTablebases = value.lower() == 'true'
+            elif name == 'tablebasepath':
+                self.tablebasePath = value
+            elif name == 'searchmode' and value in ('selective', 'fullwidth'):
+                self.searchMode = value
+            elif name == 'moveoverhead':
+                self.moveOverhead = max(0, int(value))
+            #Ponder only tells the engine the GUI may send go ponder, so there is nothing to set
+        except ValueError:
+            self.send(f'info string invalid value {value} for {name}')
+
+    def setPosition(self, words):
+        #position startpos [moves ...] or position fen <fen> [moves ...]
+        if len(words) == 0:
+            return
+        movesIndex = words.index('moves') if 'moves' in words else len(words)
+        if words[0] == 'startpos':
+            fen = STARTFEN
+        elif words[0] == 'fen':
+            fen = ' '.join(words[1:movesIndex])
+        else:
+            return
+        board = chessLogic.Board(fen)
+        for moveName in words[movesIndex+1:]:
+            move = findMove(board, moveName)
+            if move is None:
+                self.send(f'info string illegal move {moveName}')
+                break
+            board.makeFullMove(move)
+        self.board = board
+
+    def go(self, words):
+        #reads the limits, e.g. go wtime 60000 btime 60000 winc 1000 binc 1000, or go depth 6
+        limits = {}
+        infinite = False
+        ponder = False
+        index = 0
+        while index < len(words):
+            word = words[index]
+            if word in GOLIMITS and index + 1 < len(words):
+                try:
+                    limits[word] = int(words[index+1])
+                except ValueError:
+                    pass
+                index += 2
+                continue
+            if word == 'infinite':
+                infinite = True
+            elif word == 'ponder':
+                ponder = True
+            index += 1
+
+        chessAI = chessEngine.ChessAI(self.board, self.board.playerToMove, self.transpositionTable, self.hashSizeMB)
+        chessAI.WORKERS = self.workers
+        chessAI.USEBOOK = self.useBook
+        chessAI.BOOKPATH = self.bookPath
+        chessAI.USETABLEBASES = self.useTablebases
+        chessAI.TABLEBASEPATH = self.tablebasePath
+        chessAI.SEARCHMODE = self.searchMode
+        if 'depth' in limits:
+            chessAI.MAXDEPTH = max(1, min(limits['depth'], chessAI.MAXDEPTH))
+        #while pondering there is no deadline, until ponderhit starts the clock
+        chessAI.pondering = ponder
+        chessAI.iterationCallback = self.sendInfo
+        timeLimit = INFINITETIME if infinite else self.getTimeLimit(limits)
+
+        self.chessAI = chessAI
+        self.releaseEvent.clear()
+        self.searchStartTime = time.perf_counter()
+        self.searchThread = threading.Thread(target=self.runSearch, args=(chessAI, timeLimit, limits.get('nodes'), infinite or ponder), daemon=True)
+        self.searchThread.start()
+
+    def getTimeLimit(self, limits):
+        #the seconds the search is given for this move
+        if 'movetime' in limits:
+            return max(limits['movetime'] - self.moveOverhead, 1) / 1000
+        clock = limits.get('wtime' if self.board.playerToMove == 'W' else 'btime')
+        if clock is None:
+            #a search with only a depth or node limit runs until it reaches it
+            if 'depth' in limits or 'nodes' in limits:
+                return INFINITETIME
+            return chessEngine.TIMELIMIT
+        increment = limits.get('winc' if self.board.playerToMove == 'W' else 'binc', 0)
+        movesToGo = max(limits.get('movestogo', MOVESTOGO), 1)
+        #an even share of the clock plus most of the increment, but never more than half the clock
+        budget = min(clock / movesToGo + increment * 3 / 4, clock / 2) - self.moveOverhead
+        return max(budget, 10) / 1000
+
+    def runSearch(self, chessAI, timeLimit, nodeLimit, waitForRelease):
+        legalMoves = chessLogic.getAllLegalMoves(self.board)
+        bestMove = chessAI.getBestMove(self.board, legalMoves, timeLimit, nodeLimit)
+        #a book or tablebase move has no iterations, so its score is sent here
+        if chessAI.completedDepth == 0 and chessAI.bestScore is not None:
+            self.send(f'info depth 0 score {self.formatScore(chessAI, chessAI.bestScore)}')
+        #the protocol does not allow a bestmove for go infinite or go ponder until stop or ponderhit
+        if waitForRelease:
+            self.releaseEvent.wait()
+        if bestMove is None:
+            self.send('bestmove 0000')
+            return
+        line = f'bestmove {chessLogic.getMoveName(bestMove)}'
+        principalVariation = chessAI.principalVariation
+        if len(principalVariation) > 1 and principalVariation[0] == bestMove:
+            line += f' ponder {chessLogic.getMoveName(principalVariation[1])}'
+        self.send(line)
+
+    def sendInfo(self, depth, score, nodes, principalVariation):
+        #called by the search after every finished iteration
+        elapsed = time.perf_counter() - self.searchStartTime
+        nodesPerSecond = int(nodes / elapsed) if elapsed > 0 else 0
+        moves = ' '.join(chessLogic.getMoveName(move) for move in principalVariation)
+        self.send(f'info depth {depth} score {self.formatScore(self.chessAI, score)} '
+                  f'nodes {nodes} nps {nodesPerSecond} time {int(elapsed * 1000)} pv {moves}')
+
+    def formatScore(self, chessAI, score):
+        #scores are in pawns for the side to move, UCI wants centipawns or moves to mate.
+        #a mate scores CHECKMATE or TABLEBASEWIN less the plies to mate, so the plies come from the score
+        if abs(score) > chessAI.CHECKMATE - chessAI.MATEPLIES:
+            plies = chessAI.CHECKMATE - abs(score)
+        elif abs(score) > chessAI.TABLEBASEWIN - chessAI.MATEPLIES:
+            plies = chessAI.TABLEBASEWIN - abs(score)
+        else:
+            return f'cp {round(score * 100)}'
+        moves = (int(plies) + 1) // 2
+        return f'mate {moves if score > 0 else -moves}'
+
+    def stopSearch(self):
+        #stops the search, if there is one, and waits for it to send its bestmove
+        if self.searchThread is not None:
+            self.chessAI.stop()
+            self.releaseEvent.set()
+            self.searchThread.join()
+            self.searchThread = None
+
+    def ponderHit(self):
+        #the opponent played the move that was pondered on, so the search carries on with its normal time
+        if self.chessAI is not None and self.chessAI.pondering:
+            self.chessAI.ponderHit()
+        self.releaseEvent.set()
+
+def findMove(board, moveName):
+    #the legal move with a coordinate name such as e2e4 or e7e8q, or None
+    for move in chessLogic.getAllLegalMoves(board):
+        if chessLogic.getMoveName(move) == moveName:
+            return move
+    return None
+
+def main():
+    engine = UCIEngine()
+    while True:
+        line = sys.stdin.readline()
+        #an empty string means stdin was closed
+        if line == '' or not engine.handleCommand(line.strip()):
+            break
+    engine.stopSearch()
+
+if __name__ == "__main__":
+    main()
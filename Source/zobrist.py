@@ -0,0 +1,23 @@
+#ZOBRIST KEYS
+#a position's key is the XOR of one random 64 bit number for each piece on its square, plus numbers
+#for the side to move, the castling rights and the en passant file. making a move only has to XOR
+#the numbers that changed, so the key is kept up to date without looking at the whole board.
+import random
+
+#a fixed seed means every process builds the same keys, so keys can be shared between them
+generator = random.Random(20240601)
+
+def randomKey():
+    return generator.getrandbits(64)
+
+#PIECEKEYS[piece letter][square], using the square numbering from bitboard.py
+PIECEKEYS = {piece: [randomKey() for square in range(64)] for piece in 'PNBRQKpnbrqk'}
+
+#XORed in when black is to move
+SIDEKEY = randomKey()
+
+#one key for each combination of the four castling rights
+CASTLINGKEYS = [randomKey() for rights in range(16)]
+
+#one key for each file an en passant capture could happen on
+ENPASSANTKEYS = [randomKey() for col in range(8)]
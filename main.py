@@ -1,2 +1,7 @@
-from Source import mainMenu
-mainMenu.main()
+from Source import startupTiming
+
+#spawned worker processes import this file again, so the game is only started when it is run
+if __name__ == "__main__":
+    from Source import mainMenu
+    startupTiming.mark("import main menu")
+    mainMenu.main()
@@ -0,0 +1,5 @@
+from Source import uci
+
+#spawned worker processes import this file again, so the engine is only started when it is run
+if __name__ == "__main__":
+    uci.main()